@@ -0,0 +1,241 @@
+# audio_capture.py - Long-lived microphone capture shared by all listeners
+#
+# Opening PyAudio + an input stream for every command costs hundreds of ms
+# before the first sample arrives, which clipped the start of commands.
+# This keeps ONE PortAudio instance and ONE open input stream for the life
+# of the process and hands out utterances from it.
+import collections
+import queue
+import threading
+import pyaudio
+from mic_registry import MicRegistry
+
+# -------- CONFIG ----------
+CHUNK = 4096
+RATE = 16000
+CHANNELS = 1
+
+# Audio kept from just BEFORE push-to-talk, so a command that starts a
+# little early isn't clipped
+PREROLL_SECONDS = 0.5
+LISTEN_TIMEOUT = 8
+# ---------------------------
+
+
+class AudioCapture:
+    """Owns the PyAudio instance and the open input stream.
+
+    A reader thread pulls CHUNK-sized blocks off the stream as they arrive,
+    keeps the most recent ones in a ring buffer and fans them out to any
+    listener that subscribed.
+    """
+
+    def __init__(self, device_index=None, rate=RATE, chunk=CHUNK,
+                 preroll_seconds=PREROLL_SECONDS):
+        self.device_index = device_index
+        self.requested_index = device_index
+        self.rate = rate
+        self.chunk = chunk
+        self.running = False
+
+        self._pa = None
+        self._stream = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._ring = collections.deque(maxlen=max(1, int(preroll_seconds * rate / chunk)))
+        self._held = None  # unbounded preroll after reset_preroll()
+        self._max_held = int(rate / chunk * LISTEN_TIMEOUT)
+        self._subscribers = []
+
+    def start(self):
+        """Open PortAudio and the input stream once, start the reader thread"""
+        if self.running:
+            return self
+
+        self._pa = pyaudio.PyAudio()
+        try:
+            self._stream = self._open_device()
+        except Exception:
+            self._pa.terminate()
+            self._pa = None
+            raise
+
+        self.running = True
+        self._thread = threading.Thread(target=self._reader, daemon=True)
+        self._thread.start()
+        return self
+
+    def _open(self, device_index):
+        return self._pa.open(
+            format=pyaudio.paInt16,
+            channels=CHANNELS,
+            rate=self.rate,
+            input=True,
+            frames_per_buffer=self.chunk,
+            input_device_index=device_index
+        )
+
+    def _open_device(self):
+        """Open the requested (or cached) mic; re-probe only if that fails"""
+        registry = MicRegistry(self._pa)
+        device_index = self.device_index
+        if device_index is None:
+            device = registry.get_device()
+            device_index = device['index'] if device else None
+
+        if device_index is not None:
+            try:
+                stream = self._open(device_index)
+                self.device_index = device_index
+                return stream
+            except Exception as e:
+                print(f"Microphone {device_index} failed ({e}), probing again...")
+                registry.invalidate()
+
+        device = registry.probe()
+        if device is None:
+            raise OSError("No working microphone found")
+        stream = self._open(device['index'])
+        self.device_index = device['index']
+        return stream
+
+    def _reader(self):
+        while self.running:
+            try:
+                data = self._stream.read(self.chunk, exception_on_overflow=False)
+            except Exception as e:
+                if self.running:
+                    print(f"Recording error: {e}")
+                break
+
+            with self._lock:
+                self._ring.append(data)
+                if self._held is not None and len(self._held) < self._max_held:
+                    self._held.append(data)
+                for q in self._subscribers:
+                    q.put_nowait(data)
+
+        # Stream died (device unplugged etc.) - get_capture() will reopen
+        self.running = False
+        with self._lock:
+            for q in self._subscribers:
+                q.put_nowait(None)
+
+    def subscribe(self, preroll=True):
+        """Queue that receives every chunk read from now on.
+
+        With preroll=True it starts with the audio still in the ring buffer
+        (or everything held since reset_preroll(), which is then used up).
+        Without it a held preroll is left for the listener it was kept for.
+        """
+        q = queue.Queue()
+        with self._lock:
+            if preroll:
+                for data in (self._held if self._held is not None else self._ring):
+                    q.put_nowait(data)
+                self._held = None
+            self._subscribers.append(q)
+        return q
+
+    def reset_preroll(self, chunks=()):
+        """Start the next utterance's preroll from these chunks.
+
+        Used after a wake word: everything read from now until the next
+        subscribe() is kept, however long the hand-over takes.
+        """
+        with self._lock:
+            self._ring.clear()
+            self._held = list(chunks)
+
+    def hand_over(self, q):
+        """Unsubscribe q and make the chunks it still holds the next preroll.
+
+        Done under the reader's lock, so no chunk read in between is lost
+        or ends up both in the leftovers and the preroll.
+        """
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+            leftover = []
+            while True:
+                try:
+                    data = q.get_nowait()
+                except queue.Empty:
+                    break
+                if data is not None:
+                    leftover.append(data)
+            self._ring.clear()
+            self._held = leftover
+
+    def unsubscribe(self, q):
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+
+    def utterance(self, max_seconds=LISTEN_TIMEOUT, preroll=True):
+        """Yield raw chunks for one utterance, at most max_seconds of live audio.
+
+        The caller decides when the utterance is over and just stops iterating.
+        """
+        q = self.subscribe(preroll=preroll)
+        max_frames = q.qsize() + int(self.rate / self.chunk * max_seconds)
+        try:
+            for _ in range(max_frames):
+                data = q.get()
+                if data is None:
+                    return
+                yield data
+        finally:
+            self.unsubscribe(q)
+            # Whatever is left in the ring belongs to this utterance (or to
+            # our own TTS right after it) - don't replay it as preroll
+            with self._lock:
+                self._ring.clear()
+
+    def close(self):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        try:
+            if self._stream is not None:
+                self._stream.stop_stream()
+                self._stream.close()
+        except Exception:
+            pass
+        if self._pa is not None:
+            self._pa.terminate()
+        self._stream = None
+        self._pa = None
+
+
+# Global capture, opened once like the Vosk model
+_capture = None
+_capture_lock = threading.Lock()
+
+def get_capture(device_index=None):
+    """Return the process-wide capture, opening it on first use.
+
+    Returns None if no microphone could be opened.
+    """
+    global _capture
+    with _capture_lock:
+        if _capture is not None:
+            if _capture.running and (device_index is None or device_index == _capture.requested_index):
+                return _capture
+            # other mic, or the stream died - free its PortAudio instance too
+            _capture.close()
+
+        _capture = AudioCapture(device_index=device_index)
+        try:
+            _capture.start()
+        except Exception as e:
+            print(f"ERROR opening audio stream: {e}")
+            _capture = None
+        return _capture
+
+def close_capture():
+    global _capture
+    with _capture_lock:
+        if _capture is not None:
+            _capture.close()
+            _capture = None
@@ -0,0 +1,147 @@
+# batch_embedder.py - Batched, parallel embedding for the RAG builder
+#
+# OllamaEmbeddings sent the chunks with no say over batch size or
+# concurrency (and rag_builder pointed it at /api/generate). This sends
+# EMBED_BATCH_SIZE chunks per /api/embed request, EMBED_WORKERS requests
+# at a time, and prints progress and chunks/s.
+#
+# Every vector is kept in an EmbeddingStore keyed by model + hash of the
+# normalized chunk text. A chunk that was embedded before - a duplicate,
+# an unchanged chunk after a rebuild, the same text in another collection,
+# or everything an interrupted build already did - is never sent again.
+import re
+import time
+import array
+import sqlite3
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from langchain_core.embeddings import Embeddings
+from llm_client import OllamaClient, OLLAMA_HOST, EMBED_MODEL
+
+# -------- CONFIG ----------
+EMBED_BATCH_SIZE = 32
+EMBED_WORKERS = 4          # match OLLAMA_NUM_PARALLEL on the server
+EMBED_TIMEOUT = 120        # per batch
+STORE_PATH = "./embedding_store.sqlite"  # outside chroma_db, survives --rebuild
+# ---------------------------
+
+
+def normalize_chunk(text):
+    """Whitespace differences don't make a chunk different"""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def chunk_hash(text):
+    return hashlib.sha1(normalize_chunk(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Persistent (model, chunk hash) -> vector table in SQLite.
+
+    On disk rather than in memory, so it can grow with the corpus; shared
+    by every collection built with the same embedding model.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS vectors ("
+                        "model TEXT, hash TEXT, vector BLOB, PRIMARY KEY (model, hash))")
+        self.db.commit()
+
+    def get_many(self, model, hashes):
+        found = {}
+        hashes = list(set(hashes))
+        for i in range(0, len(hashes), 500):  # SQLite's variable limit
+            part = hashes[i:i + 500]
+            rows = self.db.execute(
+                f"SELECT hash, vector FROM vectors WHERE model = ? AND hash IN ({','.join('?' * len(part))})",
+                [model] + part)
+            for h, blob in rows:
+                found[h] = array.array("f", blob).tolist()
+        return found
+
+    def put_many(self, model, items):
+        """Store (hash, vector) pairs; committed at once so they survive a crash"""
+        self.db.executemany("INSERT OR REPLACE INTO vectors VALUES (?, ?, ?)",
+                            [(model, h, array.array("f", v).tobytes()) for h, v in items])
+        self.db.commit()
+
+    def count(self, model):
+        return self.db.execute("SELECT COUNT(*) FROM vectors WHERE model = ?", (model,)).fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+
+class BatchEmbeddings(Embeddings):
+    """LangChain Embeddings that batch, parallelize and reuse stored vectors"""
+
+    def __init__(self, model=EMBED_MODEL, host=OLLAMA_HOST, batch_size=EMBED_BATCH_SIZE,
+                 workers=EMBED_WORKERS, store_path=STORE_PATH):
+        self.model = model
+        self.batch_size = batch_size
+        self.workers = workers
+        self.store = EmbeddingStore(store_path)
+        self.client = OllamaClient(host=host, model=model, read_timeout=EMBED_TIMEOUT,
+                                   pool_size=workers)
+        self.embedded = 0          # totals over all embed_documents() calls
+        self.reused = 0
+        self.elapsed = 0.0
+        stored = self.store.count(model)
+        if stored:
+            print(f"Embedding store: {stored} vectors for {model} can be reused")
+
+    def _embed_batch(self, batch):
+        vectors = self.client.embed([text for _, text in batch], model=self.model)
+        if len(vectors) != len(batch):
+            raise RuntimeError(f"expected {len(batch)} embeddings, got {len(vectors)}")
+        return [(key, vector) for (key, _), vector in zip(batch, vectors)]
+
+    def embed_documents(self, texts):
+        """Vectors for texts - called once per ingest batch by the builder, so
+        only this call's vectors are held in memory"""
+        keys = [chunk_hash(t) for t in texts]
+        done = self.store.get_many(self.model, keys)
+        todo = {}
+        for key, text in zip(keys, texts):
+            if key not in done:
+                todo.setdefault(key, text)  # identical chunks are embedded once
+        self.reused += sum(1 for k in keys if k in done)
+        todo = list(todo.items())
+        batches = [todo[i:i + self.batch_size] for i in range(0, len(todo), self.batch_size)]
+
+        total = len(todo)
+        finished = 0
+        start = time.time()
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            futures = [pool.submit(self._embed_batch, batch) for batch in batches]
+            for future in as_completed(futures):
+                results = future.result()
+                self.store.put_many(self.model, results)
+                done.update(results)
+
+                finished += len(results)
+                elapsed = self.elapsed + time.time() - start
+                rate = (self.embedded + finished) / elapsed if elapsed else 0.0
+                print(f"\r  🧠 {self.embedded + finished} chunks embedded, {self.reused} reused"
+                      f" | {rate:.1f} chunks/s   ", end="", flush=True)
+        except BaseException:
+            # Ctrl+C or a failed batch: what's stored stays stored, drop the rest
+            pool.shutdown(wait=False, cancel_futures=True)
+            print(f"\n❌ Embedding stopped after {self.embedded + finished} chunks - run again to resume.")
+            raise
+        pool.shutdown()
+
+        self.embedded += total
+        self.elapsed += time.time() - start
+        return [done[k] for k in keys]
+
+    def report(self):
+        elapsed = max(self.elapsed, 1e-6)
+        print(f"\n✓ Embedded {self.embedded} chunks in {self.elapsed:.1f}s "
+              f"({self.embedded / elapsed:.1f} chunks/s), reused {self.reused} stored vectors")
+
+    def embed_query(self, text):
+        return self.client.embed(text, model=self.model)[0]
@@ -0,0 +1,103 @@
+# command_grammar.py - Grammar-constrained fast path for whitelisted commands
+#
+# A second KaldiRecognizer limited to the exact command phrases (generated
+# from WHITELISTED_ACTIONS + exit phrases) runs on the same audio frames as
+# the open-vocabulary one. It is tiny, so "open notepad" is resolved the
+# moment Vosk finalizes it, and never has to go through the LLM.
+#
+# NOTE: runtime grammars need a model that supports them (small / lgraph
+# models). Full models like vosk-model-en-us-0.22 ignore the grammar - with
+# one of those the grammar runs on a separate small model, and the fast
+# path is off if there is none (see grammar_model).
+import os
+import json
+from vosk import Model, KaldiRecognizer
+
+# -------- CONFIG ----------
+EXIT_PHRASES = ["exit", "quit", "goodbye", "shut down"]
+MIN_CONFIDENCE = 0.7  # average word confidence needed to trust a match
+# ---------------------------
+
+
+def action_phrases(name, action):
+    """Spoken forms of one whitelisted action.
+
+    "open_notepad" -> "open notepad", plus any extra "phrases" listed in the
+    action entry.
+    """
+    phrases = [name.replace("_", " ").lower()]
+    for phrase in action.get("phrases", []):
+        phrase = phrase.lower().strip()
+        if phrase not in phrases:
+            phrases.append(phrase)
+    return phrases
+
+
+def grammar_supported(model_dir):
+    """False for models with a precompiled static graph (graph/HCLG.fst).
+
+    Vosk ignores runtime grammars for those, so a grammar recognizer would
+    just be a second full-vocabulary decoder on every chunk.
+    """
+    return not os.path.exists(os.path.join(model_dir, "graph", "HCLG.fst"))
+
+
+def grammar_model(model, model_dir, grammar_dir=None):
+    """Model for the command grammar: the open-vocabulary one if it takes
+    runtime grammars, else the small / lgraph model in grammar_dir.
+    None (fast path off) if that one is missing or can't be loaded."""
+    if grammar_supported(model_dir):
+        return model
+    if not grammar_dir or not os.path.isdir(grammar_dir) or not grammar_supported(grammar_dir):
+        print("(speech model ignores grammars and no small command model found - command fast path off)")
+        return None
+    try:
+        return Model(grammar_dir)
+    except Exception as e:
+        print(f"(could not load command model {grammar_dir}: {e} - command fast path off)")
+        return None
+
+
+class CommandGrammar:
+    """Maps exact spoken phrases to ("action", name) or ("exit", None)"""
+
+    def __init__(self, actions, exit_phrases=EXIT_PHRASES, min_confidence=MIN_CONFIDENCE):
+        self.min_confidence = min_confidence
+        self.phrases = {}
+        for name, action in actions.items():
+            for phrase in action_phrases(name, action):
+                self.phrases[phrase] = ("action", name)
+        for phrase in exit_phrases:
+            self.phrases[phrase.lower()] = ("exit", None)
+
+    def grammar_json(self):
+        return json.dumps(sorted(self.phrases) + ["[unk]"])
+
+    def recognizer(self, model, rate):
+        rec = KaldiRecognizer(model, rate, self.grammar_json())
+        rec.SetMaxAlternatives(0)
+        rec.SetWords(True)  # per-word confidence for match()
+        return rec
+
+    def match(self, result_json):
+        """Command for a Vosk result from recognizer(), or None.
+
+        Only an exact, confident whole-phrase match counts - anything with
+        [unk] in it belongs to the open-vocabulary path.
+        """
+        try:
+            result = json.loads(result_json)
+        except Exception:
+            return None
+
+        text = result.get("text", "").strip()
+        command = self.phrases.get(text)
+        if command is None:
+            return None
+
+        words = result.get("result", [])
+        if words:
+            confidence = sum(w.get("conf", 0.0) for w in words) / len(words)
+            if confidence < self.min_confidence:
+                return None
+        return command
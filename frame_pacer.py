@@ -0,0 +1,152 @@
+# frame_pacer.py - Frame rate that follows what the assistant is doing
+#
+# The HUDs rendered flat out no matter what: integrated.py at a fixed
+# 30 FPS, visual.py every 1 ms, rag.py at 400 FPS - a whole core while the
+# assistant just sits there. FramePacer gives each renderer a target rate
+# per assistant state (a few FPS when idle, smooth while listening /
+# thinking / speaking; 0 pauses), wakes a sleeping render thread as soon
+# as the state changes, skips a frame when the consumer hasn't taken the
+# previous one yet and keeps frame-time statistics.
+import time
+import threading
+import collections
+
+# -------- CONFIG ----------
+STATE_FPS = {
+    "idle": 5,
+    "listening": 30,
+    "thinking": 30,
+    "speaking": 30,
+}
+LINGER = 1.0          # seconds the active rate is kept after going idle / poke()
+STATS_WINDOW = 120    # frames kept for the frame-time statistics
+# ---------------------------
+
+
+class FramePacer:
+    """Paces one renderer; set_state() / poke() may be called from any thread.
+
+    Render thread:                      Tk after() loop:
+        while pacer.wait():                 if pacer.begin_frame():
+            if pacer.begin_frame(busy):         draw()
+                render()                        pacer.end_frame()
+                pacer.end_frame()           root.after(pacer.delay_ms(), loop)
+    """
+
+    def __init__(self, name="HUD", rates=None, state="idle", linger=LINGER):
+        self.name = name
+        self.rates = dict(STATE_FPS if rates is None else rates)
+        self.linger = linger
+        self.state = state
+        self.running = True
+        self._active_until = 0.0   # keep the active rate until then
+        self._last_tick = 0.0
+        self._frame_start = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+        self.frames = 0
+        self.skipped = 0           # frames not rendered because the consumer was behind
+        self._times = collections.deque(maxlen=STATS_WINDOW)   # render seconds
+        self._ticks = collections.deque(maxlen=STATS_WINDOW)   # frame start times
+
+    # --- state ---
+    def set_state(self, state):
+        with self._lock:
+            if state == self.state:
+                return
+            if self.rates.get(state, 0) < self.rates.get(self.state, 0):
+                # slowing down: stay smooth a little longer
+                self._active_until = time.perf_counter() + self.linger
+            self.state = state
+        self._wake.set()
+
+    def poke(self):
+        """Something changed on screen (e.g. a slider moved) - render at the
+        active rate for a moment even though the assistant is idle"""
+        with self._lock:
+            self._active_until = time.perf_counter() + self.linger
+        self._wake.set()
+
+    @property
+    def fps(self):
+        """Target frame rate right now; 0 = paused"""
+        with self._lock:
+            rate = self.rates.get(self.state, 0)
+            if time.perf_counter() < self._active_until:
+                rate = max(rate, max(self.rates.values()))
+        return rate
+
+    # --- timing ---
+    def _remaining(self):
+        fps = self.fps
+        if fps <= 0:
+            return None
+        return self._last_tick + 1.0 / fps - time.perf_counter()
+
+    def wait(self):
+        """Sleep until the next frame is due; False once stopped"""
+        while self.running:
+            remaining = self._remaining()
+            if remaining is not None and remaining <= 0:
+                self._last_tick = time.perf_counter()
+                return True
+            # paused: check back now and then; a state change wakes us early
+            self._wake.wait(0.5 if remaining is None else remaining)
+            self._wake.clear()
+        return False
+
+    def delay_ms(self):
+        """Milliseconds until the next frame, for Tk's after()"""
+        remaining = self._remaining()
+        if remaining is None:
+            return 250  # paused: just look at the state again
+        return max(1, int(remaining * 1000))
+
+    def begin_frame(self, busy=False):
+        """Start a frame; False (counted as skipped) if the consumer still
+        hasn't taken the previous one"""
+        now = time.perf_counter()
+        self._last_tick = now
+        if busy:
+            self.skipped += 1
+            return False
+        self._frame_start = now
+        self._ticks.append(now)
+        return True
+
+    def end_frame(self):
+        if self._frame_start is not None:
+            self._times.append(time.perf_counter() - self._frame_start)
+            self._frame_start = None
+            self.frames += 1
+
+    # --- statistics ---
+    def stats(self):
+        """{fps, mean_ms, p95_ms, max_ms, frames, skipped} over the last frames"""
+        times = sorted(self._times)
+        ticks = list(self._ticks)
+        fps = 0.0
+        if len(ticks) > 1 and ticks[-1] > ticks[0]:
+            fps = (len(ticks) - 1) / (ticks[-1] - ticks[0])
+        if not times:
+            return {"fps": fps, "mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0,
+                    "frames": self.frames, "skipped": self.skipped}
+        return {
+            "fps": fps,
+            "mean_ms": sum(times) / len(times) * 1000,
+            "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))] * 1000,
+            "max_ms": times[-1] * 1000,
+            "frames": self.frames,
+            "skipped": self.skipped,
+        }
+
+    def report(self):
+        s = self.stats()
+        print(f"  [{self.name}] {s['frames']} frames, {s['fps']:.1f} FPS ({self.state}) | "
+              f"frame {s['mean_ms']:.1f} ms avg, {s['p95_ms']:.1f} ms p95, {s['max_ms']:.1f} ms max | "
+              f"{s['skipped']} skipped")
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
@@ -0,0 +1,56 @@
+# frame_transport.py - Rendered frames from a render thread to the UI
+#
+# The GL worker used to read every frame into fresh bytes, wrap them in a
+# PIL image and flip it on the CPU; Tk then resized it (to the same size)
+# and built a new PhotoImage. FrameExchange keeps three preallocated
+# buffers instead: the renderer fills one in place (fbo.read_into), the
+# newest finished one waits for the UI, and the UI holds the one on screen.
+# Nothing is allocated per frame and nothing is copied between threads.
+import threading
+
+
+class FrameExchange:
+    """Triple buffer between one producer thread and one consumer"""
+
+    def __init__(self, width, height, components=4):
+        self.width = width
+        self.height = height
+        self.size = width * height * components
+        self._buffers = [bytearray(self.size) for _ in range(3)]
+        self._back = 0        # being written by the producer
+        self._ready = None    # newest finished frame, not taken yet
+        self._front = None    # taken by the consumer, on screen
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0      # finished frames replaced before they were taken
+
+    # --- producer side ---
+    def back_buffer(self):
+        """Buffer to render the next frame into"""
+        return self._buffers[self._back]
+
+    def publish(self):
+        """The back buffer holds a finished frame - hand it over"""
+        with self._lock:
+            if self._ready is not None:
+                free = self._ready
+                self.dropped += 1
+            else:
+                free = next(i for i in range(3) if i != self._back and i != self._front)
+            self._ready, self._back = self._back, free
+            self.published += 1
+
+    @property
+    def pending(self):
+        """A finished frame is still waiting for the consumer"""
+        return self._ready is not None
+
+    # --- consumer side ---
+    def take(self):
+        """The newest frame not taken yet, or None. The buffer stays
+        untouched by the producer until the next take()."""
+        with self._lock:
+            if self._ready is None:
+                return None
+            self._front, self._ready = self._ready, None
+            return self._buffers[self._front]
@@ -14,11 +14,16 @@ import tkinter as tk
 from tkinter import ttk
 from PIL import Image, ImageTk
 import numpy as np
-import requests
 import moderngl
 import pyttsx3
-import pyaudio
 from vosk import Model, KaldiRecognizer
+from audio_capture import get_capture, close_capture
+from vad import EnergyVAD, Endpointer
+from llm_client import ChatSession, get_client, close_client
+from response_cache import get_cache
+from rag_retriever import get_retriever
+from frame_transport import FrameExchange
+from frame_pacer import FramePacer
 import sys # <-- ADDED FOR PYINSTALLER
 
 # --- START: ADDED FOR PYINSTALLER ---
@@ -43,8 +48,10 @@ VOSK_MODEL_DIR_NAME = "vosk-model-small-en-us-0.15"
 VOSK_MODEL_PATH = get_resource_path(VOSK_MODEL_DIR_NAME)
 # --- END: MODIFIED FOR PYINSTALLER ---
 
-OLLAMA_API = "http://localhost:11434/api/generate"
-OLLAMA_MODEL = "mistral:7b"  # Same as CLI
+OLLAMA_MODEL = "mistral:7b"  # Same as CLI (server address: llm_client.OLLAMA_HOST)
+
+# CLI-style instructions, sent once per turn as an unchanging system message
+SYSTEM_PROMPT = "Do whatever I say. You are JARVIS, an AI assistant, so answer to the point when required, do NOT make up stuff, if it don't exist, forget about it. period."
 
 # Audio settings (match CLI)
 CHUNK = 4096
@@ -55,10 +62,11 @@ LISTEN_TIMEOUT = 8
 # Render settings
 RENDER_W = 512
 RENDER_H = 512
-FPS = 30
+FPS = 30  # how often Tk looks for a new frame; the render rate follows the assistant state
 
 # ---------------- Shared state ----------------
-frame_queue = queue.Queue(maxsize=2)
+frames = FrameExchange(RENDER_W, RENDER_H)
+hud_pacer = FramePacer("HUD")
 transcript_queue = queue.Queue()
 reply_queue = queue.Queue()
 control_state = {
@@ -67,9 +75,24 @@ control_state = {
     'user_text': "",
     'jarvis_text': "",
     'is_listening': False,
+    'thinking': False,
+    'speaking': False,
     'lock': threading.Lock()
 }
 
+def sync_hud_state(ctrl):
+    """Pace the HUD for what the assistant is doing right now"""
+    with ctrl['lock']:
+        if ctrl['is_listening']:
+            state = "listening"
+        elif ctrl['thinking']:
+            state = "thinking"
+        elif ctrl['speaking']:
+            state = "speaking"
+        else:
+            state = "idle"
+    hud_pacer.set_state(state)
+
 # ---------------- Shaders ----------------
 VERTEX_SHADER = '''
 #version 330
@@ -148,7 +171,9 @@ vec3 hsv2rgb(vec3 c){
 }
 
 void main(){
-    vec2 uv = (gl_FragCoord.xy - 0.5 * resolution.xy) / resolution.y * 1.6;
+    // y flipped here: fbo rows are read bottom-up, Tk wants the top row first
+    vec2 frag = vec2(gl_FragCoord.x, resolution.y - gl_FragCoord.y);
+    vec2 uv = (frag - 0.5 * resolution.xy) / resolution.y * 1.6;
     float d = length(uv);
     float t = time;
 
@@ -199,10 +224,11 @@ void main(){
 
 # ---------------- GL Worker ----------------
 class GLWorker(threading.Thread):
-    def __init__(self, frame_q, ctrl_state):
+    def __init__(self, frames, ctrl_state, pacer):
         super().__init__(daemon=True)
-        self.frame_q = frame_q
+        self.frames = frames
         self.ctrl = ctrl_state
+        self.pacer = pacer
         self.running = True
 
     def run(self):
@@ -225,11 +251,12 @@ class GLWorker(threading.Thread):
         tex.filter = (moderngl.LINEAR, moderngl.LINEAR)
 
         start = time.time()
-        frame_time = 1.0 / FPS
 
-        while self.running:
-            tnow = time.time()
-            elapsed = tnow - start
+        while self.running and self.pacer.wait():
+            # Tk hasn't shown the last frame yet - don't render another
+            if not self.pacer.begin_frame(busy=self.frames.pending):
+                continue
+            elapsed = time.time() - start
 
             with self.ctrl['lock']:
                 intensity = float(self.ctrl['intensity'])
@@ -245,24 +272,10 @@ class GLWorker(threading.Thread):
             prog['hue_offset'].value = float(hue)
             
             vao.render()
-            data = fbo.read(components=4, alignment=1)
-            img = Image.frombytes('RGBA', (RENDER_W, RENDER_H), data)
-            img = img.transpose(Image.FLIP_TOP_BOTTOM)
-
-            try:
-                if self.frame_q.qsize() >= 2:
-                    _ = self.frame_q.get_nowait()
-            except:
-                pass
-            try:
-                self.frame_q.put_nowait(img)
-            except:
-                pass
-
-            dt = time.time() - tnow
-            sleep_time = frame_time - dt
-            if sleep_time > 0:
-                time.sleep(sleep_time)
+            # Straight into a preallocated buffer, already the right way up
+            fbo.read_into(self.frames.back_buffer(), components=4, alignment=1)
+            self.frames.publish()
+            self.pacer.end_frame()
 
         fbo.release()
         tex.release()
@@ -272,6 +285,7 @@ class GLWorker(threading.Thread):
 
     def stop(self):
         self.running = False
+        self.pacer.stop()
 
 # ---------------- STT Worker (CLI-style) ----------------
 class STTWorker(threading.Thread):
@@ -282,6 +296,7 @@ class STTWorker(threading.Thread):
         self.model_path = model_path
         self.running = True
         self.model = None
+        self.vad = EnergyVAD(rate=RATE)
 
     def run(self):
         if not os.path.isdir(self.model_path):
@@ -298,6 +313,9 @@ class STTWorker(threading.Thread):
             print(f"Model load error: {e}")
             return
 
+        # Open the mic now so the first press already has preroll audio
+        get_capture()
+
         # Listen loop waits for trigger
         while self.running:
             with self.ctrl['lock']:
@@ -311,6 +329,7 @@ class STTWorker(threading.Thread):
                 # Reset listening flag AFTER we're done
                 with self.ctrl['lock']:
                     self.ctrl['is_listening'] = False
+                sync_hud_state(self.ctrl)
                 
                 print("✓ Ready for next command")
             
@@ -318,37 +337,10 @@ class STTWorker(threading.Thread):
 
     def _listen_once(self):
         """CLI-style listening with silence detection"""
-        p = pyaudio.PyAudio()
-        
-        # Find working mic
-        device_index = None
-        for i in range(p.get_device_count()):
-            try:
-                info = p.get_device_info_by_index(i)
-                if info['maxInputChannels'] > 0:
-                    test_stream = p.open(
-                        format=pyaudio.paInt16, channels=1, rate=RATE,
-                        input=True, frames_per_buffer=CHUNK, input_device_index=i
-                    )
-                    test_stream.close()
-                    device_index = i
-                    break
-            except:
-                continue
-        
-        if device_index is None:
+        # Shared long-lived stream, opened once for the whole session
+        capture = get_capture()
+        if capture is None:
             print("No working microphone")
-            p.terminate()
-            return ""
-
-        try:
-            stream = p.open(
-                format=pyaudio.paInt16, channels=CHANNELS, rate=RATE,
-                input=True, frames_per_buffer=CHUNK, input_device_index=device_index
-            )
-        except Exception as e:
-            print(f"Stream error: {e}")
-            p.terminate()
             return ""
 
         rec = KaldiRecognizer(self.model, RATE)
@@ -357,50 +349,29 @@ class STTWorker(threading.Thread):
 
         print("🎤 Listening...")
         
-        frames_recorded = 0
-        max_frames = int(RATE / CHUNK * LISTEN_TIMEOUT)
-        silence_frames = 0
-        silence_threshold = 15
-        got_speech = False
+        # VAD gate: only speech (plus a little context) reaches Vosk
+        endpoint = Endpointer(self.vad, CHUNK / RATE)
         final_text = ""
 
         try:
-            while frames_recorded < max_frames:
-                data = stream.read(CHUNK, exception_on_overflow=False)
-                frames_recorded += 1
-
-                if rec.AcceptWaveform(data):
-                    result = json.loads(rec.Result())
-                    text = result.get("text", "")
-                    if text:
-                        got_speech = True
-                        final_text = text
-                        silence_frames = 0
-                        # print(f"  ✓ Got: {text[:50]}") # Commented out to reduce console spam
-                else:
-                    partial = json.loads(rec.PartialResult())
-                    partial_text = partial.get("partial", "")
-                    if partial_text:
-                        got_speech = True
-                        silence_frames = 0
-                    elif got_speech:
-                        silence_frames += 1
-                        if silence_frames > silence_threshold:
-                            print("  (silence detected)")
-                            break
+            for data in capture.utterance(LISTEN_TIMEOUT):
+                feed, done = endpoint.process(data)
+                for chunk in feed:
+                    if rec.AcceptWaveform(chunk):
+                        result = json.loads(rec.Result())
+                        text = result.get("text", "")
+                        if text:
+                            final_text = f"{final_text} {text}".strip()
+                            # print(f"  ✓ Got: {text[:50]}") # Commented out to reduce console spam
+                if done:
+                    print("  (silence detected)")
+                    break
 
         except Exception as e:
             print(f"Recording error: {e}")
-        finally:
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
 
         final_result = json.loads(rec.FinalResult())
-        text = final_result.get("text", "").strip()
-        
-        if not text and final_text:
-            text = final_text
+        text = f"{final_text} {final_result.get('text', '')}".strip()
 
         return text
 
@@ -415,6 +386,10 @@ class LLMWorker(threading.Thread):
         self.reply_q = reply_q
         self.ctrl = control_state
         self.running = True
+        # Multi-turn session: the system prefix is evaluated once, not per
+        # question. The knowledge base index is opened here, once, at startup
+        self.session = ChatSession(SYSTEM_PROMPT, model=OLLAMA_MODEL, cache=get_cache(),
+                                   retriever=get_retriever())
 
     def run(self):
         while self.running:
@@ -428,56 +403,40 @@ class LLMWorker(threading.Thread):
                 self.ctrl['user_text'] = text
                 self.ctrl['jarvis_text'] = "Thinking..."
                 self.ctrl['intensity'] = 1.0
+                self.ctrl['thinking'] = True
+            sync_hud_state(self.ctrl)
+
+            # Stream the reply: every finished sentence goes to the TTS
+            # queue right away (num_predict=100 is the length budget)
+            reply = self.session.stream(text, max_tokens=100)
+            spoken = []
+            for sentence in reply:
+                self.reply_q.put_nowait(sentence)
+                spoken.append(sentence)
+                with self.ctrl['lock']:
+                    self.ctrl['jarvis_text'] = " ".join(spoken)
 
-            # Use CLI-style prompt
-            prompt = f"""Do whatever I say. You are JARVIS, an AI assistant, so answer to the point when required, do NOT make up stuff, if it don't exist, forget about it. period.
-User: {text}
-JARVIS:"""
-
-            response = ""
-            try:
-                payload = {
-                    "model": OLLAMA_MODEL,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.7,
-                        "num_predict": 100,
-                        "num_ctx": 2048,
-                        "num_thread": 4,
-                    }
-                }
-                
-                r = requests.post(OLLAMA_API, json=payload, timeout=45)
-                r.raise_for_status()
-                result = r.json()
-                response = result.get("response", "").strip()
-                
-                if not response:
-                    response = "Error generating response."
-                
-                # Limit length for TTS
-                if len(response) > 200:
-                    response = response[:200] + "..."
-                    
-            except Exception as e:
-                response = f"Error: {str(e)}"
-
-            self.reply_q.put_nowait(response)
+            response = reply.text
+            if not response:
+                response = "Error generating response."
+                self.reply_q.put_nowait(response)
 
             # Reset status to ready
             with self.ctrl['lock']:
                 self.ctrl['jarvis_text'] = response
                 self.ctrl['intensity'] = 0.0
+                self.ctrl['thinking'] = False
+            sync_hud_state(self.ctrl)
 
     def stop(self):
         self.running = False
 
 # ---------------- TTS Worker ----------------
 class TTSWorker(threading.Thread):
-    def __init__(self, reply_q):
+    def __init__(self, reply_q, control_state):
         super().__init__(daemon=True)
         self.reply_q = reply_q
+        self.ctrl = control_state
         self.running = True
         self.engine = None
 
@@ -494,6 +453,7 @@ class TTSWorker(threading.Thread):
             except queue.Empty:
                 continue
 
+            self._set_speaking(True)
             try:
                 if self.engine:
                     print(f"JARVIS: {text}")
@@ -501,6 +461,12 @@ class TTSWorker(threading.Thread):
                     self.engine.runAndWait()
             except Exception as e:
                 print(f"TTS error: {e}")
+            self._set_speaking(not self.reply_q.empty())
+
+    def _set_speaking(self, speaking):
+        with self.ctrl['lock']:
+            self.ctrl['speaking'] = speaking
+        sync_hud_state(self.ctrl)
 
     def stop(self):
         self.running = False
@@ -592,8 +558,10 @@ class JarvisApp:
                                bg='black', highlightthickness=0)
         self.canvas.pack(fill='both', expand=True)
 
-        # Start workers
-        self.gl_worker = GLWorker(frame_queue, self.ctrl)
+        # Start workers (the LLM warms up while the STT worker loads Vosk)
+        get_client().warm_up_async(OLLAMA_MODEL)
+
+        self.gl_worker = GLWorker(frames, self.ctrl, hud_pacer)
         self.gl_worker.start()
 
         self.stt = STTWorker(transcript_queue, self.ctrl, VOSK_MODEL_PATH)
@@ -602,10 +570,12 @@ class JarvisApp:
         self.llm = LLMWorker(transcript_queue, reply_queue, self.ctrl)
         self.llm.start()
 
-        self.tts = TTSWorker(reply_queue)
+        self.tts = TTSWorker(reply_queue, self.ctrl)
         self.tts.start()
 
-        self._photo = None
+        # One PhotoImage and one canvas item, updated in place every frame
+        self._photo = ImageTk.PhotoImage('RGBA', (RENDER_W, RENDER_H))
+        self.canvas.create_image(RENDER_W//2, RENDER_H//2, image=self._photo, tags="HUDIMG")
         
         self._poll_frames()
         self._poll_state()
@@ -658,6 +628,7 @@ class JarvisApp:
         # Trigger listening in background
         with self.ctrl['lock']:
             self.ctrl['is_listening'] = True
+        sync_hud_state(self.ctrl)
         
         self.status_var.set("🎤 Listening...")
         self.status_label.config(foreground='red')
@@ -704,27 +675,30 @@ class JarvisApp:
     def _on_intensity(self, _=None):
         with self.ctrl['lock']:
             self.ctrl['intensity'] = float(self.int_var.get())
+        hud_pacer.poke()
 
     def _on_hue(self, _=None):
         with self.ctrl['lock']:
             self.ctrl['hue_offset'] = float(self.hue_var.get())
+        hud_pacer.poke()
 
     def _poll_frames(self):
-        try:
-            img = frame_queue.get_nowait()
-            self._photo = ImageTk.PhotoImage(img.resize((RENDER_W, RENDER_H), Image.LANCZOS))
-            self.canvas.delete("HUDIMG")
-            self.canvas.create_image(RENDER_W//2, RENDER_H//2, image=self._photo, tags="HUDIMG")
-        except queue.Empty:
-            pass
+        data = frames.take()
+        if data is not None:
+            # frombuffer wraps the buffer without copying; paste() is the one copy into Tk
+            img = Image.frombuffer('RGBA', (RENDER_W, RENDER_H), data, 'raw', 'RGBA', 0, 1)
+            self._photo.paste(img)
         
         self.root.after(int(1000 / FPS), self._poll_frames)
 
     def _quit(self):
         self.gl_worker.stop()
+        hud_pacer.report()
         self.stt.stop()
         self.llm.stop()
         self.tts.stop()
+        close_capture()
+        close_client()
         time.sleep(0.1)
         self.root.destroy()
 
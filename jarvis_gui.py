@@ -6,6 +6,8 @@ import random
 import threading
 import time
 
+PARTICLE_POOL = 40  # canvas items made up front (a particle lives 30 frames)
+
 class JarvisGUI:
     def __init__(self, root):
         self.root = root
@@ -66,6 +68,9 @@ class JarvisGUI:
         # Particle effects
         self.particles = []
         
+        # Canvas items are created once and moved / recolored every frame
+        self._create_items()
+        
         # Dragging
         self.drag_data = {"x": 0, "y": 0}
         self.canvas.bind("<ButtonPress-1>", self.start_drag)
@@ -120,90 +125,88 @@ class JarvisGUI:
         self.current_color = self.speaking_color
         self.set_status("Speaking...")
     
-    def draw_morphing_circle(self):
-        """Draw a morphing organic circle"""
-        self.canvas.delete("all")
+    def _create_items(self):
+        """Create the shape, glow, core and a pool of particle items once"""
+        # Direction of each morph point never changes
+        self.morph_dirs = [(math.cos(i / self.morph_points * 2 * math.pi),
+                            math.sin(i / self.morph_points * 2 * math.pi))
+                           for i in range(self.morph_points)]
+        flat = [self.center_x, self.center_y] * self.morph_points
+        
+        # Stacking order as it was drawn: shape, glow, core, particles
+        self.shape_item = self.canvas.create_polygon(
+            flat, fill=self.current_color, outline=self.current_color, width=2, smooth=True)
+        self.glow_item = self.canvas.create_polygon(
+            flat, fill="", outline=self.current_color, width=1, smooth=True)
+        self.core_item = self.canvas.create_oval(0, 0, 0, 0, fill="white", outline="")
+        self.drawn_color = self.current_color
         
+        self.particle_items = []   # hidden until a particle needs one
+        self.particles_shown = 0
+        self._grow_particle_pool(PARTICLE_POOL)
+    
+    def _grow_particle_pool(self, count):
+        for _ in range(count):
+            self.particle_items.append(self.canvas.create_oval(
+                0, 0, 0, 0, fill=self.drawn_color, outline="", state="hidden"))
+    
+    def draw_morphing_circle(self):
+        """Draw a morphing organic circle (moves the existing canvas items)"""
         # Update morph offsets smoothly
         for i in range(self.morph_points):
             diff = self.morph_targets[i] - self.morph_offsets[i]
             self.morph_offsets[i] += diff * 0.1
         
-        # Calculate points for polygon
+        # Add pulse when listening
+        if self.listening:
+            pulse = math.sin(self.angle * 2) * 10
+        else:
+            pulse = 0
+        
+        # Calculate points for the shape and its glow (outer ring, 10px out)
         points = []
-        for i in range(self.morph_points):
-            angle = (i / self.morph_points) * 2 * math.pi
-            
+        glow_points = []
+        for i, (dx, dy) in enumerate(self.morph_dirs):
             # Add jiggle when thinking
             if self.thinking:
                 jiggle = math.sin(self.angle * 3 + i) * 5
             else:
                 jiggle = 0
             
-            # Add pulse when listening
-            if self.listening:
-                pulse = math.sin(self.angle * 2) * 10
-            else:
-                pulse = 0
-            
             radius = self.base_radius + self.morph_offsets[i] + jiggle + pulse
-            
-            x = self.center_x + radius * math.cos(angle)
-            y = self.center_y + radius * math.sin(angle)
-            points.extend([x, y])
+            points.extend([self.center_x + radius * dx, self.center_y + radius * dy])
+            glow_points.extend([self.center_x + (radius + 10) * dx,
+                                self.center_y + (radius + 10) * dy])
         
-        # Draw main shape
-        self.canvas.create_polygon(
-            points,
-            fill=self.current_color,
-            outline=self.current_color,
-            width=2,
-            smooth=True
-        )
-        
-        # Draw glow effect (outer ring)
-        glow_points = []
-        for i in range(self.morph_points):
-            angle = (i / self.morph_points) * 2 * math.pi
-            if self.thinking:
-                jiggle = math.sin(self.angle * 3 + i) * 5
-            else:
-                jiggle = 0
-            if self.listening:
-                pulse = math.sin(self.angle * 2) * 10
-            else:
-                pulse = 0
-            
-            radius = self.base_radius + self.morph_offsets[i] + jiggle + pulse + 10
-            x = self.center_x + radius * math.cos(angle)
-            y = self.center_y + radius * math.sin(angle)
-            glow_points.extend([x, y])
+        self.canvas.coords(self.shape_item, points)
+        self.canvas.coords(self.glow_item, glow_points)
         
-        self.canvas.create_polygon(
-            glow_points,
-            fill="",
-            outline=self.current_color,
-            width=1,
-            smooth=True
-        )
+        # Recolor only when the state changed
+        if self.drawn_color != self.current_color:
+            self.drawn_color = self.current_color
+            self.canvas.itemconfig(self.shape_item, fill=self.current_color, outline=self.current_color)
+            self.canvas.itemconfig(self.glow_item, outline=self.current_color)
+            for item in self.particle_items:
+                self.canvas.itemconfig(item, fill=self.current_color)
         
-        # Draw center core
+        # Center core
         core_size = 8
         if self.thinking:
             core_size += math.sin(self.angle * 5) * 3
         
-        self.canvas.create_oval(
+        self.canvas.coords(
+            self.core_item,
             self.center_x - core_size,
             self.center_y - core_size,
             self.center_x + core_size,
             self.center_y + core_size,
-            fill="white",
-            outline=""
         )
         
-        # Draw particles when thinking
+        # Particles only while thinking
         if self.thinking:
             self.update_particles()
+        else:
+            self._show_particles(0)
     
     def update_particles(self):
         """Create and update particle effects"""
@@ -219,7 +222,7 @@ class JarvisGUI:
                 'life': 30
             })
         
-        # Update and draw particles
+        # Update particles
         for particle in self.particles[:]:
             particle['x'] += particle['vx']
             particle['y'] += particle['vy']
@@ -227,17 +230,29 @@ class JarvisGUI:
             
             if particle['life'] <= 0:
                 self.particles.remove(particle)
-            else:
-                # Draw particle
-                size = particle['life'] / 10
-                self.canvas.create_oval(
-                    particle['x'] - size,
-                    particle['y'] - size,
-                    particle['x'] + size,
-                    particle['y'] + size,
-                    fill=self.current_color,
-                    outline=""
-                )
+        
+        # Draw them with pooled items
+        if len(self.particles) > len(self.particle_items):
+            self._grow_particle_pool(len(self.particles) - len(self.particle_items))
+        for particle, item in zip(self.particles, self.particle_items):
+            size = particle['life'] / 10
+            self.canvas.coords(
+                item,
+                particle['x'] - size,
+                particle['y'] - size,
+                particle['x'] + size,
+                particle['y'] + size,
+            )
+        self._show_particles(len(self.particles))
+    
+    def _show_particles(self, count):
+        """Show the first `count` pooled particle items, hide the rest"""
+        shown = self.particles_shown
+        for item in self.particle_items[shown:count]:
+            self.canvas.itemconfig(item, state="normal")
+        for item in self.particle_items[count:shown]:
+            self.canvas.itemconfig(item, state="hidden")
+        self.particles_shown = count
     
     def animate(self):
         """Main animation loop"""
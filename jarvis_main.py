@@ -1,26 +1,37 @@
 # jarvis_main.py — Full integration of JARVIS GUI + backend
 
 import threading
-import time
 import tkinter as tk
 
 from jarvis_opt import (
     load_model,
     listen_once_optimized,
-    query_ollama,
+    stream_reply,
     speak,
     handle_action,
-    list_all_mics,
+    cached_mic,
+    choose_mic,
+    wait_for_wake_word,
+    speech,
+    HANDS_FREE,
+    OLLAMA_MODEL,
 )
+from audio_capture import get_capture
+from llm_client import get_client
 from jarvis_gui import JarvisGUI
 
 
 class JarvisController:
-    def __init__(self, gui: JarvisGUI, mic_index=None):
+    def __init__(self, gui: JarvisGUI, mic_index=None, hands_free=HANDS_FREE):
         self.gui = gui
         self.mic_index = mic_index
+        self.hands_free = hands_free
         self.running = True
+        get_client().warm_up_async(OLLAMA_MODEL)  # LLM loads while vosk does
         load_model()  # preload vosk
+        capture = get_capture(mic_index)
+        if capture is not None:
+            speech.attach_capture(capture)  # talking over JARVIS interrupts it
         speak("Jarvis system online.")
         self.gui.set_idle()
 
@@ -28,9 +39,17 @@ class JarvisController:
         """Main loop connecting GUI + backend"""
         while self.running:
             try:
-                # Wait for user to press Enter before listening
+                # Wait for the wake word (or Enter) before listening - after
+                # a barge-in the user is already talking, so listen right away
+                interrupted = speech.wait()
                 self.gui.set_idle()
-                input("\n[Press Enter to speak] ")
+                if interrupted:
+                    print("\n(interrupted - listening)")
+                elif self.hands_free:
+                    if not wait_for_wake_word(self.mic_index):
+                        continue
+                else:
+                    input("\n[Press Enter to speak] ")
 
                 # Listening phase
                 self.gui.root.after(0, self.gui.set_listening)
@@ -45,6 +64,7 @@ class JarvisController:
                 if any(x in lower_text for x in ["exit", "quit", "shutdown", "goodbye"]):
                     self.gui.root.after(0, self.gui.set_idle)
                     speak("Goodbye, Neil.")
+                    speech.wait()
                     self.running = False
                     break
 
@@ -56,20 +76,18 @@ class JarvisController:
 
                 # Thinking phase (LLM)
                 self.gui.root.after(0, self.gui.set_thinking)
-                prompt = (
+                template = (
                     "You are JARVIS, Neil's personal offline AI assistant. "
-                    "Respond efficiently and naturally.\nUser: " + user_text + "\nJARVIS:"
+                    "Respond efficiently and naturally.\nUser: {question}\nJARVIS:"
                 )
-                response = query_ollama(prompt)
+                reply = stream_reply(template, user_text)
 
-                # Speaking phase
-                self.gui.root.after(0, self.gui.set_speaking)
-                if len(response) > 250:
-                    response = response[:250] + "..."
-                speak(response)
-
-                # Return to idle
-                self.gui.root.after(0, self.gui.set_idle)
+                # Speaking phase - starts with the first finished sentence
+                for sentence in reply:
+                    if speech.interrupted:
+                        break  # stops the generation too
+                    self.gui.root.after(0, self.gui.set_speaking)
+                    speak(sentence)
 
             except KeyboardInterrupt:
                 self.running = False
@@ -82,7 +100,7 @@ class JarvisController:
         # Cleanup before exit
         self.gui.set_idle()
         speak("System offline.")
-        time.sleep(1)
+        speech.wait(timeout=5)
         self.gui.root.quit()
 
 
@@ -91,20 +109,15 @@ def main():
     print(" JARVIS — Full Offline Assistant ")
     print("=" * 60)
 
-    print("Listing microphones...")
-    working_mics = list_all_mics()
-    if not working_mics:
+    # Cached mic from a previous run, otherwise list + test them all once
+    mic_idx = cached_mic()
+    if mic_idx is None:
+        mic_idx = choose_mic()
+    if mic_idx is None:
         print("❌ No working microphones found.")
         input("Press Enter to exit...")
         return
 
-    if len(working_mics) == 1:
-        mic_idx = working_mics[0]
-    else:
-        print(f"Available mics: {working_mics}")
-        choice = input(f"Select mic index (default {working_mics[0]}): ").strip()
-        mic_idx = int(choice) if choice.isdigit() and int(choice) in working_mics else working_mics[0]
-
     print(f"Using microphone index: {mic_idx}\n")
 
     # Setup GUI
@@ -1,12 +1,19 @@
 # jarvis.py - Optimized for Low-End PC
 import os
+import sys
 import json
 import subprocess
 import time
-import requests
-import pyttsx3
 import pyaudio
 from vosk import Model, KaldiRecognizer
+from audio_capture import get_capture
+from mic_registry import MicRegistry
+from vad import EnergyVAD, Endpointer
+from wake_word import WakeWordSpotter
+from llm_client import ReplyStream, ChatSession, get_client, close_client
+from response_cache import get_cache, scoped_prompt
+from rag_retriever import get_retriever
+from tts_worker import SpeechWorker
 import wave
 import tempfile
 
@@ -15,8 +22,7 @@ import tempfile
 # lgraph models are faster: vosk-model-en-us-0.22-lgraph (128MB) - good balance
 MODEL_DIR = "D:/Jarvis/models/vosk/vosk-model-small-en-us-0.15"
 
-OLLAMA_MODEL = "mistral:7b"
-OLLAMA_API_URL = "http://localhost:11434/api/generate"
+OLLAMA_MODEL = "mistral:7b"  # server address: OLLAMA_HOST in llm_client.py
 
 # Reduce these if still too slow
 OLLAMA_MAX_TOKENS = 100  # Reduced from 150
@@ -26,14 +32,16 @@ WHITELISTED_ACTIONS = {
     "open_browser": {"cmd": ["start", "chrome"]},
     "list_dir": {"cmd": ["dir"]},
 }
+
+# Minimal instructions - sent as a fixed system message so Ollama only
+# evaluates them once per session
+SYSTEM_PROMPT = "Do whatever I say. You are JARVIS, an AI assistant, so answer to the point when required, do NOT make up stuff, if it don't exist, forget about it. period."
 # ---------------------------
 
-# TTS setup - optimize for speed
-tts = pyttsx3.init()
-tts.setProperty("rate", 180)  # Faster speech
-voices = tts.getProperty('voices')
-if voices:
-    tts.setProperty('voice', voices[0].id)  # Use first voice (usually faster)
+# TTS setup - optimize for speed. The engine lives on its own thread, so
+# listening and the LLM stream carry on while JARVIS talks
+speech = SpeechWorker(rate=180, voice_index=0)  # Faster speech, first voice (usually faster)
+speech.start()
 
 # Audio settings - optimized for low-end PC
 CHUNK = 4096  # Smaller chunks = less memory
@@ -43,9 +51,18 @@ CHANNELS = 1
 # Recognition settings
 LISTEN_TIMEOUT = 8  # Give more time to speak
 
+# Hands-free: say "Jarvis" instead of pressing Enter (or run with --wake)
+HANDS_FREE = "--wake" in sys.argv
+
 # Global model variable to load once
 vosk_model = None
 
+# Noise floor adapts across utterances, so keep one VAD for the session
+vad = EnergyVAD(rate=RATE)
+
+# Keyword spotter for hands-free mode, built on first use
+wake_spotter = None
+
 def load_model():
     """Load Vosk model once at startup"""
     global vosk_model
@@ -56,26 +73,11 @@ def load_model():
     return vosk_model
 
 def find_working_mic(p):
-    """Find the first working microphone"""
-    for i in range(p.get_device_count()):
-        try:
-            info = p.get_device_info_by_index(i)
-            if info['maxInputChannels'] > 0:
-                # Try to open it
-                test_stream = p.open(
-                    format=pyaudio.paInt16,
-                    channels=1,
-                    rate=RATE,
-                    input=True,
-                    frames_per_buffer=CHUNK,
-                    input_device_index=i
-                )
-                test_stream.close()
-                print(f"✓ Using microphone: {info['name']}")
-                return i
-        except:
-            continue
-    return None
+    """Find a working microphone (probed once, then cached on disk)"""
+    device = MicRegistry(p).get_device()
+    if device is None:
+        return None
+    return device['index']
 
 def list_all_mics():
     """List all audio devices with detailed info"""
@@ -115,47 +117,61 @@ def list_all_mics():
     
     return working_mics
 
-def speak(text):
-    """Speak text using TTS"""
-    if not text:
-        return
-    print(f"JARVIS: {text}")
+def cached_mic():
+    """Index of the microphone cached by a previous run, without probing"""
+    p = pyaudio.PyAudio()
     try:
-        tts.say(text)
-        tts.runAndWait()
-    except:
-        print("(TTS error, continuing...)")
+        device = MicRegistry(p).cached()
+    finally:
+        p.terminate()
+    return device['index'] if device else None
 
-def query_ollama(prompt, max_tokens=100):
-    """Query Ollama - optimized for low-end PC"""
-    try:
-        payload = {
-            "model": OLLAMA_MODEL,
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0.7,
-                "num_predict": max_tokens,
-                "num_ctx": 2048,  # Reduced context window
-                "num_thread": 4,  # Use all 4 cores of i5-6500T
-            }
-        }
-        
-        response = requests.post(OLLAMA_API_URL, json=payload, timeout=45)
-        response.raise_for_status()
-        
-        result = response.json()
-        text = result.get("response", "Error generating response.")
-        # Clean up response
-        text = text.strip()
-        return text
+def choose_mic():
+    """List and test all mics, let the user pick one, and cache the choice"""
+    print("\nTesting audio devices...")
+    working_mics = list_all_mics()
+    if not working_mics:
+        return None
     
-    except requests.exceptions.ConnectionError:
-        return "Ollama not running. Start it with: ollama serve"
-    except requests.exceptions.Timeout:
-        return "Response timed out. Try a simpler question."
-    except Exception as e:
-        return f"Error: {str(e)}"
+    print(f"\n✓ Found {len(working_mics)} working microphone(s)")
+    
+    # Let user choose
+    if len(working_mics) == 1:
+        mic_idx = working_mics[0]
+        print(f"Using device {mic_idx}")
+    else:
+        print(f"\nWorking devices: {working_mics}")
+        choice = input(f"Select mic index (or Enter for {working_mics[0]}): ").strip()
+        if choice.isdigit() and int(choice) in working_mics:
+            mic_idx = int(choice)
+        else:
+            mic_idx = working_mics[0]
+    
+    p = pyaudio.PyAudio()
+    try:
+        MicRegistry(p).remember(mic_idx)
+    finally:
+        p.terminate()
+    return mic_idx
+
+def speak(text):
+    """Queue text for the TTS thread - returns immediately"""
+    speech.say(text)
+
+def stream_reply(template, question, max_tokens=OLLAMA_MAX_TOKENS):
+    """Streamed reply to `question`, asked through a prompt template with a
+    {question} slot - iterate it for finished sentences.
+
+    A question answered before through the same template comes from the
+    cache; a new answer is stored once it has been read to the end.
+    """
+    cache = get_cache()
+    prompt, scope = scoped_prompt(OLLAMA_MODEL, template, question)
+    cached = cache.get(question, scope)
+    if cached is not None:
+        return cached
+    return ReplyStream(prompt, max_tokens=max_tokens, model=OLLAMA_MODEL,
+                       on_complete=cache.remember(question, scope))
 
 def handle_action(command_text):
     """Execute whitelisted system actions"""
@@ -189,107 +205,94 @@ def listen_once_optimized(device_index=None):
     """
     model = load_model()
     
-    p = pyaudio.PyAudio()
-    
-    # If no device specified, find a working one
-    if device_index is None:
-        device_index = find_working_mic(p)
-        if device_index is None:
-            print("ERROR: No working microphone found!")
-            p.terminate()
-            return ""
-    
-    stream_params = {
-        "format": pyaudio.paInt16,
-        "channels": CHANNELS,
-        "rate": RATE,
-        "input": True,
-        "frames_per_buffer": CHUNK,
-        "input_device_index": device_index
-    }
-    
-    try:
-        stream = p.open(**stream_params)
-    except Exception as e:
-        print(f"ERROR opening audio stream: {e}")
+    # One long-lived stream for the whole session (opened on first use)
+    capture = get_capture(device_index)
+    if capture is None:
         print("Try running with microphone selection (list mics at startup)")
-        p.terminate()
         return ""
+    
     rec = KaldiRecognizer(model, RATE)
     rec.SetMaxAlternatives(0)
     rec.SetWords(False)  # Disable word-level timestamps for speed
     
     print("🎤 Speak now...")
     
-    frames_recorded = 0
-    max_frames = int(RATE / CHUNK * LISTEN_TIMEOUT)  # Max frames based on timeout
-    silence_frames = 0
-    silence_threshold = 15  # Wait longer before stopping (1.5s of silence)
-    got_speech = False
+    # VAD decides speech vs. silence - silent chunks never reach Vosk
+    endpoint = Endpointer(vad, CHUNK / RATE)
     final_text = ""
     
     try:
-        while frames_recorded < max_frames:
-            data = stream.read(CHUNK, exception_on_overflow=False)
-            frames_recorded += 1
-            
-            if rec.AcceptWaveform(data):
-                result = json.loads(rec.Result())
-                text = result.get("text", "")
-                if text:
-                    got_speech = True
-                    final_text = text  # Store the recognized text
-                    silence_frames = 0
-                    print(f"  ✓ Got: {text[:50]}")
-            else:
-                partial = json.loads(rec.PartialResult())
-                partial_text = partial.get("partial", "")
-                if partial_text:
-                    got_speech = True
-                    silence_frames = 0
-                    # Show what we're hearing
-                    print(f"  Hearing: {partial_text[:50]}", end='\r')
-                elif got_speech:
-                    # Silence after speech detected
-                    silence_frames += 1
-                    if silence_frames > silence_threshold:
-                        # Stop early if silence detected after speech
-                        print("\n  (silence detected, stopping)")
-                        break
-        
-        print()  # New line
+        for data in capture.utterance(LISTEN_TIMEOUT):
+            feed, done = endpoint.process(data)
+            for chunk in feed:
+                if rec.AcceptWaveform(chunk):
+                    result = json.loads(rec.Result())
+                    text = result.get("text", "")
+                    if text:
+                        final_text = f"{final_text} {text}".strip()  # Store the recognized text
+                        print(f"  ✓ Got: {text[:50]}")
+            if done:
+                # Stop early if silence detected after speech
+                print("  (silence detected, stopping)")
+                break
         
     except Exception as e:
         print(f"Recording error: {e}")
-    finally:
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
 
-    # Get final result
+    # Get final result (plus anything Vosk already finalized mid-utterance)
     final_result = json.loads(rec.FinalResult())
-    text = final_result.get("text", "").strip()
+    text = f"{final_text} {final_result.get('text', '')}".strip()
     
-    # If final result is empty but we stored text from AcceptWaveform, use that
-    if not text and final_text:
-        text = final_text
-    
-    if not text and got_speech:
+    if not text and endpoint.got_speech:
         print("⚠ Speech detected but transcription unclear")
     
     return text
 
-def main_loop(mic_index=None):
+def wait_for_wake_word(device_index=None):
+    """Block until the wake word is heard - only then run the full recognizer"""
+    global wake_spotter
+    capture = get_capture(device_index)
+    if capture is None:
+        time.sleep(1)
+        return False
+    
+    if wake_spotter is None or wake_spotter.capture is not capture:
+        wake_spotter = WakeWordSpotter(load_model(), capture, vad=vad)
+    
+    print("\n[Say 'Jarvis' to speak] ")
+    if not wake_spotter.wait():
+        return False
+    print("  ✓ Wake word")
+    return True
+
+def main_loop(mic_index=None, hands_free=HANDS_FREE):
     """Main loop - optimized"""
     
-    # Pre-load model
+    # Load the LLM in the background while Vosk loads, then open the mic once
+    get_client().warm_up_async(OLLAMA_MODEL)
     load_model()
+    capture = get_capture(mic_index)
+    if capture is not None:
+        speech.attach_capture(capture)  # talking over JARVIS interrupts it
     
     speak("Jarvis ready.")
     
+    # One conversation for the whole run: fixed system prefix + rolling
+    # history, plus knowledge base chunks for each question (index opened once)
+    session = ChatSession(SYSTEM_PROMPT, model=OLLAMA_MODEL, cache=get_cache(),
+                          retriever=get_retriever())
+    
     while True:
         try:
-            input("\n[Enter to speak] ")
+            # Don't listen to ourselves - unless the user already cut in,
+            # then they are talking right now
+            if speech.wait():
+                print("\n(interrupted - listening)")
+            elif hands_free:
+                if not wait_for_wake_word(mic_index):
+                    continue
+            else:
+                input("\n[Enter to speak] ")
             
             # Listen
             user_text = listen_once_optimized(device_index=mic_index)
@@ -304,6 +307,7 @@ def main_loop(mic_index=None):
             lower_text = user_text.lower()
             if any(x in lower_text for x in ["exit", "quit", "goodbye", "shut down"]):
                 speak("Goodbye.")
+                speech.wait()
                 break
             
             # Short-circuit for simple actions
@@ -311,32 +315,22 @@ def main_loop(mic_index=None):
                 handle_action(user_text)
                 continue
             
-            # Build minimal prompt
-            prompt = f"""Do whatever I say. You are JARVIS, an AI assistant, so answer to the point when required, do NOT make up stuff, if it don't exist, forget about it. period.
-User: {user_text}
-JARVIS:"""
-            
-            # Query LLM
+            # Query LLM - stream the reply and speak each sentence as soon
+            # as it's complete (OLLAMA_MAX_TOKENS caps the length)
             print("Thinking...")
-            response = query_ollama(prompt, max_tokens=OLLAMA_MAX_TOKENS)
+            reply = session.stream(user_text, max_tokens=OLLAMA_MAX_TOKENS)
+            for sentence in reply:
+                if speech.interrupted:
+                    break  # stops the generation too
+                speak(sentence)
             
-            # Handle response
-            if "ACTION:" in response:
-                parts = response.split("ACTION:", 1)
-                speech_part = parts[0].strip()
-                action_part = parts[1].strip()
-                
-                if speech_part:
-                    speak(speech_part)
-                handle_action(action_part)
-            else:
-                # Limit response length for TTS speed
-                if len(response) > 200:
-                    response = response[:200] + "..."
-                speak(response)
+            # Handle action part of the response
+            if reply.action:
+                handle_action(reply.action)
             
         except KeyboardInterrupt:
             speak("Shutting down.")
+            speech.wait()
             break
         except Exception as e:
             print(f"Error: {e}")
@@ -349,11 +343,13 @@ if __name__ == "__main__":
     print(f"LLM: {OLLAMA_MODEL}")
     print("="*50)
     
-    # Always list and test microphones first
-    print("\nTesting audio devices...")
-    working_mics = list_all_mics()
+    # Reuse the microphone that worked last time - only list and test every
+    # device when nothing is cached (delete the mic cache file to choose again)
+    mic_idx = cached_mic()
+    if mic_idx is None:
+        mic_idx = choose_mic()
     
-    if not working_mics:
+    if mic_idx is None:
         print("\n❌ ERROR: No working microphones found!")
         print("\nTroubleshooting:")
         print("1. Check if your microphone is plugged in")
@@ -363,24 +359,15 @@ if __name__ == "__main__":
         input("\nPress Enter to exit...")
         exit(1)
     
-    print(f"\n✓ Found {len(working_mics)} working microphone(s)")
-    
-    # Let user choose
-    if len(working_mics) == 1:
-        mic_idx = working_mics[0]
-        print(f"Using device {mic_idx}")
-    else:
-        print(f"\nWorking devices: {working_mics}")
-        choice = input(f"Select mic index (or Enter for {working_mics[0]}): ").strip()
-        if choice.isdigit() and int(choice) in working_mics:
-            mic_idx = int(choice)
-        else:
-            mic_idx = working_mics[0]
-    
     print(f"\n✓ Selected microphone index: {mic_idx}")
     print("\n✓ Starting JARVIS...\n")
     
     try:
         main_loop(mic_index=mic_idx)
     except KeyboardInterrupt:
-        print("\nBye.")
\ No newline at end of file
+        print("\nBye.")
+    finally:
+        count, mean_ms, max_ms = speech.latency_stats()
+        if count:
+            print(f"Barge-in: {count}x, stopped speaking {mean_ms:.0f} ms after you started (max {max_ms:.0f} ms)")
+        close_client()
\ No newline at end of file
@@ -2,23 +2,42 @@
 import os
 import json
 import subprocess
-import time
-import requests
-import pyaudio
 import pyttsx3
 from vosk import Model, KaldiRecognizer
+from audio_capture import get_capture
+from vad import EnergyVAD, Endpointer
+from command_grammar import CommandGrammar, EXIT_PHRASES, grammar_model
+from llm_client import ChatSession, get_client
+from response_cache import get_cache
 
 # -------- CONFIG ----------
 MODEL_DIR = "D:/Jarvis/models/vosk/vosk-model-en-us-0.22"
+# The full model above ignores runtime grammars, so the command fast path
+# runs on this small model (~40 MB). Missing = commands go through the LLM
+COMMAND_MODEL_DIR = os.environ.get("JARVIS_COMMAND_MODEL",
+                                   "D:/Jarvis/models/vosk/vosk-model-small-en-us-0.15")
 OLLAMA_MODEL = "mistral:7b"  # or just "mistral" depending on your ollama setup
-OLLAMA_API_URL = "http://localhost:11434/api/generate"
 
 WHITELISTED_ACTIONS = {
     "open_notepad": {"cmd": ["notepad"]},
-    "open_browser": {"cmd": ["start", "chrome"]},  # Windows
-    "list_dir": {"cmd": ["dir"]},  # Windows (use ["ls", "-la"] for Linux)
-    # add your allowed actions here
+    "open_browser": {"cmd": ["start", "chrome"], "phrases": ["open chrome"]},  # Windows
+    "list_dir": {"cmd": ["dir"], "phrases": ["list directory", "list files", "show files"]},  # Windows (use ["ls", "-la"] for Linux)
+    # add your allowed actions here ("phrases" = extra spoken forms for the command grammar)
 }
+
+# Sent unchanged every turn as the chat system message (see ChatSession)
+SYSTEM_PROMPT = """You are JARVIS, an AI assistant. Be concise and helpful.
+If the user asks you to perform a system action (open notepad, open browser, list files), 
+respond naturally AND include 'ACTION:' followed by the action name on a new line.
+
+Examples:
+User: "Open notepad"
+You: "Opening notepad for you, sir.
+ACTION: open notepad"
+
+User: "What's the weather like?"
+You: "I don't have access to weather data, but you can check your local weather service."
+"""
 # ---------------------------
 
 # TTS setup
@@ -29,41 +48,19 @@ tts.setProperty("rate", 170)
 CHUNK = 4096
 RATE = 16000
 
+vosk_model = None
+command_model = None  # model the command grammar runs on (None = fast path off)
+vad = EnergyVAD(rate=RATE)
+
+# Exact command phrases recognized on a tiny grammar, bypassing the LLM
+command_grammar = CommandGrammar(WHITELISTED_ACTIONS, EXIT_PHRASES)
+
 def speak(text):
     """Speak text using TTS"""
     print("JARVIS:", text)
     tts.say(text)
     tts.runAndWait()
 
-def query_ollama(prompt, max_tokens=200):
-    """
-    Query Ollama API with streaming disabled for simpler response handling.
-    Returns the complete response text.
-    """
-    try:
-        payload = {
-            "model": OLLAMA_MODEL,
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0.7,
-                "num_predict": max_tokens,
-            }
-        }
-        
-        response = requests.post(OLLAMA_API_URL, json=payload, timeout=30)
-        response.raise_for_status()
-        
-        result = response.json()
-        return result.get("response", "I couldn't generate a response.")
-    
-    except requests.exceptions.ConnectionError:
-        return "Error: Could not connect to Ollama. Make sure Ollama is running (try 'ollama serve' in terminal)."
-    except requests.exceptions.Timeout:
-        return "Error: Request timed out."
-    except Exception as e:
-        return f"Error querying Ollama: {str(e)}"
-
 def handle_action(command_text):
     """
     Parse and execute whitelisted system actions.
@@ -79,83 +76,108 @@ def handle_action(command_text):
         action = WHITELISTED_ACTIONS.get("list_dir")
 
     if action:
-        speak("Executing action.")
-        try:
-            result = subprocess.run(
-                action["cmd"], 
-                capture_output=True, 
-                text=True, 
-                timeout=15,
-                shell=True  # needed for Windows commands like 'dir' and 'start'
-            )
-            speak("Action completed.")
-            if result.stdout:
-                print(result.stdout)
-        except Exception as e:
-            speak(f"Action failed: {str(e)}")
+        run_action(action)
     else:
         speak("No safe action identified for that command.")
 
+def run_action(action):
+    """Execute one entry of WHITELISTED_ACTIONS"""
+    speak("Executing action.")
+    try:
+        result = subprocess.run(
+            action["cmd"], 
+            capture_output=True, 
+            text=True, 
+            timeout=15,
+            shell=True  # needed for Windows commands like 'dir' and 'start'
+        )
+        speak("Action completed.")
+        if result.stdout:
+            print(result.stdout)
+    except Exception as e:
+        speak(f"Action failed: {str(e)}")
+
+def load_model():
+    """Load Vosk model once instead of on every listen"""
+    global vosk_model, command_model
+    if vosk_model is None:
+        print("Loading speech model (one-time load)...")
+        vosk_model = Model(MODEL_DIR)
+        command_model = grammar_model(vosk_model, MODEL_DIR, COMMAND_MODEL_DIR)
+    return vosk_model
+
 def listen_once(device_index=None):
     """
-    Listen for speech and return transcribed text.
+    Listen for speech and return (transcribed text, command).
+    command is ("action", name) / ("exit", None) when the command grammar
+    recognized a whitelisted phrase, otherwise None.
     Set device_index to None to use default microphone, or specify your device index.
     """
-    p = pyaudio.PyAudio()
+    model = load_model()
+    capture = get_capture(device_index)
+    if capture is None:
+        return "", None
     
-    # Use default device if device_index is None
-    stream_params = {
-        "format": pyaudio.paInt16,
-        "channels": 1,
-        "rate": RATE,
-        "input": True,
-        "frames_per_buffer": CHUNK
-    }
-    if device_index is not None:
-        stream_params["input_device_index"] = device_index
-    
-    stream = p.open(**stream_params)
-    model = Model(MODEL_DIR)
     rec = KaldiRecognizer(model, RATE)
     rec.SetWords(True)
+    # Only on a grammar-capable model - otherwise it would be a second full decoder
+    cmd_rec = command_grammar.recognizer(command_model, RATE) if command_model is not None else None
+    endpoint = Endpointer(vad, CHUNK / RATE)
 
     print("Listening... (speak now, 5 second timeout)")
-    start = time.time()
-    timeout = 5
+    final_text = ""
 
     try:
-        while time.time() - start < timeout:
-            data = stream.read(CHUNK, exception_on_overflow=False)
-            if rec.AcceptWaveform(data):
-                pass  # partial result
+        for data in capture.utterance(5):
+            feed, done = endpoint.process(data)
+            for chunk in feed:
+                # Both recognizers get the same frames; the grammar one is tiny
+                if cmd_rec is not None and cmd_rec.AcceptWaveform(chunk):
+                    command = command_grammar.match(cmd_rec.Result())
+                    if command:
+                        return command_text(command), command
+                if rec.AcceptWaveform(chunk):
+                    text = json.loads(rec.Result()).get("text", "")
+                    final_text = f"{final_text} {text}".strip()
+            if done:
+                break
     except Exception as e:
         print(f"Error during recording: {e}")
-    finally:
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
+
+    command = command_grammar.match(cmd_rec.FinalResult()) if cmd_rec is not None else None
+    if command:
+        return command_text(command), command
 
     # Get final transcription
     final = rec.FinalResult()
     try:
         j = json.loads(final)
-        text = j.get("text", "")
+        text = f"{final_text} {j.get('text', '')}"
     except Exception:
-        text = ""
+        text = final_text
     
-    return text.strip()
+    return text.strip(), None
+
+def command_text(command):
+    """Readable text for a grammar match (for logging)"""
+    kind, name = command
+    return name.replace("_", " ") if kind == "action" else "exit"
 
 def main_loop():
     """Main interaction loop"""
+    # Load the LLM and the Vosk model side by side before the first question
+    get_client().warm_up_async(OLLAMA_MODEL)
+    load_model()
     speak("Jarvis online. Press Enter to speak.")
     
-    # Conversation history for context (optional)
-    conversation_history = []
+    # Conversation history for context - the system preamble stays fixed so
+    # Ollama evaluates it once per session, history is a rolling window
+    session = ChatSession(SYSTEM_PROMPT, model=OLLAMA_MODEL, cache=get_cache())
     
     while True:
         try:
             input("\n[Press Enter to speak...]\n")
-            user_text = listen_once()  # Remove device_index parameter or set to your mic index
+            user_text, command = listen_once()  # Remove device_index parameter or set to your mic index
             
             if not user_text:
                 speak("I didn't catch that. Try again.")
@@ -163,46 +185,34 @@ def main_loop():
             
             print(f"\nYou said: {user_text}")
             
+            # Fast path: the command grammar matched an exact whitelisted phrase
+            if command:
+                kind, name = command
+                if kind == "exit":
+                    speak("Goodbye sir.")
+                    break
+                run_action(WHITELISTED_ACTIONS[name])
+                continue
+            
             # Check for exit commands
-            if any(word in user_text.lower() for word in ["exit", "quit", "goodbye", "shut down"]):
+            if any(word in user_text.lower() for word in EXIT_PHRASES):
                 speak("Goodbye sir.")
                 break
             
-            # Build prompt for Ollama
-            system_context = """You are JARVIS, an AI assistant. Be concise and helpful.
-If the user asks you to perform a system action (open notepad, open browser, list files), 
-respond naturally AND include 'ACTION:' followed by the action name on a new line.
-
-Examples:
-User: "Open notepad"
-You: "Opening notepad for you, sir.
-ACTION: open notepad"
-
-User: "What's the weather like?"
-You: "I don't have access to weather data, but you can check your local weather service."
-"""
-            
-            prompt = f"{system_context}\n\nUser: {user_text}\nJARVIS:"
-            
             # Query Ollama
             print("Thinking...")
-            response = query_ollama(prompt, max_tokens=150)
+            reply = session.stream(user_text, max_tokens=150, timeout=30)
+            
+            # Speak sentence by sentence while the rest is still generating
+            for sentence in reply:
+                speak(sentence)
             
-            print(f"\nRaw response:\n{response}\n")
+            print(f"\nRaw response:\n{reply.text}\n")
             
             # Check for action commands
-            if "ACTION:" in response:
-                parts = response.split("ACTION:", 1)
-                speech_text = parts[0].strip()
-                action_text = parts[1].strip()
-                
-                if speech_text:
-                    speak(speech_text)
-                
-                print(f"Detected action: {action_text}")
-                handle_action(action_text)
-            else:
-                speak(response)
+            if reply.action:
+                print(f"Detected action: {reply.action}")
+                handle_action(reply.action)
             
         except KeyboardInterrupt:
             print("\nInterrupted by user.")
@@ -0,0 +1,438 @@
+# llm_client.py - Shared Ollama client: pooled HTTP session + streaming
+#
+# Every query_ollama() used to call the module-level requests.post, paying
+# a fresh TCP connect per turn and rebuilding the same payload in five
+# places. OllamaClient keeps one pooled requests.Session (keep-alive) with
+# connect/read timeouts and retry-with-backoff on refused and reset
+# connections - never after a read timeout.
+#
+# With "stream": False nothing can be spoken until the whole reply is done,
+# so ReplyStream reads Ollama's NDJSON token stream and hands out each
+# sentence as soon as it is complete.
+import os
+import re
+import json
+import collections
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.exceptions import ReadTimeoutError
+
+# -------- CONFIG ----------
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_MODEL = "mistral:7b"
+OLLAMA_MAX_TOKENS = 100
+DEFAULT_OPTIONS = {
+    "temperature": 0.7,
+    "num_ctx": 2048,
+    "num_thread": 4,
+}
+CONNECT_TIMEOUT = 3.05   # seconds to establish the TCP connection
+READ_TIMEOUT = 45        # seconds to wait between bytes of the reply
+MAX_RETRIES = 3          # on connection reset / refused / 502-504 (not on read timeouts)
+RETRY_BACKOFF = 0.5      # 0.5s, 1s, 2s ...
+POOL_SIZE = 4
+
+# How long Ollama keeps the model in memory after each request ("30m",
+# "2h", -1 = until it is stopped, 0 = unload right away). Without it the
+# model gets unloaded after 5 idle minutes and the next question pays the
+# full load time again.
+KEEP_ALIVE = os.environ.get("JARVIS_KEEP_ALIVE", "30m")
+UNLOAD_ON_EXIT = False   # free the model's RAM when the assistant quits
+WARMUP_TIMEOUT = 180     # loading a 7B model from disk can take a while
+LOG_TIMINGS = True       # print load / prompt / generation times per reply
+HISTORY_TURNS = 6        # user/assistant exchanges kept by ChatSession
+EMBED_MODEL = "nomic-embed-text:latest"  # same model rag_builder.py indexes with
+# ---------------------------
+
+# Sentence end: . ! ? (optionally followed by quotes/brackets), then whitespace
+SENTENCE_END = re.compile(r'([.!?]["\')\]]*)\s+|\n+')
+ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "e.g.", "i.e.", "etc.", "vs.", "st."}
+
+
+class SentenceSplitter:
+    """Accumulates streamed tokens and returns finished sentences"""
+
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, token):
+        self.buffer += token
+        sentences = []
+        start = 0
+        for m in SENTENCE_END.finditer(self.buffer):
+            candidate = self.buffer[start:m.end()].strip()
+            last_word = candidate.split()[-1].lower() if candidate else ""
+            if last_word in ABBREVIATIONS:
+                continue
+            if candidate:
+                sentences.append(candidate)
+            start = m.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return rest
+
+
+class ResetRetry(Retry):
+    """Retry that re-sends after a reset connection but not after a read
+    timeout. urllib3 counts both as read errors; a reset usually means a
+    pooled keep-alive socket Ollama had already closed, while a timeout
+    means it may still be generating - sending again would run the whole
+    generation / embed batch a second time."""
+
+    def increment(self, method=None, url=None, response=None, error=None,
+                  _pool=None, _stacktrace=None):
+        if isinstance(error, ReadTimeoutError):
+            raise error.with_traceback(_stacktrace)
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+class OllamaClient:
+    """One pooled, keep-alive HTTP session for all Ollama calls"""
+
+    def __init__(self, host=OLLAMA_HOST, model=OLLAMA_MODEL, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, retries=MAX_RETRIES, backoff=RETRY_BACKOFF,
+                 keep_alive=KEEP_ALIVE, pool_size=POOL_SIZE):
+        if not host.startswith("http"):
+            host = "http://" + host
+        self.host = host.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+        self.last_stats = {}
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        # Retries cover reaching Ollama: refused connections, connections
+        # reset before a response arrived (stale keep-alive sockets) and
+        # 502-504 while it restarts. Read timeouts are never retried
+        retry = ResetRetry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=None,  # POST too - the request was never answered
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _timeout(self, read_timeout=None):
+        return (self.connect_timeout, read_timeout or self.read_timeout)
+
+    def payload(self, prompt=None, messages=None, model=None, max_tokens=OLLAMA_MAX_TOKENS,
+                options=None, stream=False):
+        """Request body for /api/generate (prompt) or /api/chat (messages) -
+        built in exactly one place"""
+        body = {
+            "model": model or self.model,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": dict(DEFAULT_OPTIONS, **(options or {}), num_predict=max_tokens),
+        }
+        if messages is not None:
+            body["messages"] = messages
+        else:
+            body["prompt"] = prompt
+        return body
+
+    def post(self, path, body, timeout=None, stream=False):
+        response = self.session.post(self.host + path, json=body, stream=stream,
+                                     timeout=self._timeout(timeout))
+        response.raise_for_status()
+        return response
+
+    def generate(self, prompt, timeout=None, **kwargs):
+        """Complete (non-streamed) reply text. Raises on HTTP/connection errors."""
+        body = self.payload(prompt, stream=False, **kwargs)
+        result = self.post("/api/generate", body, timeout=timeout).json()
+        self._record(result)
+        return result.get("response", "").strip()
+
+    def stream(self, prompt=None, messages=None, timeout=None, **kwargs):
+        """Yield (token, final_chunk) pairs with streaming on.
+
+        Uses /api/chat when messages are given, /api/generate otherwise.
+        final_chunk is the parsed last NDJSON line (done=True, with timings
+        and done_reason) or None for normal tokens.
+        """
+        body = self.payload(prompt, messages=messages, stream=True, **kwargs)
+        path = "/api/chat" if messages is not None else "/api/generate"
+        with self.post(path, body, timeout=timeout, stream=True) as response:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                if messages is not None:
+                    token = chunk.get("message", {}).get("content", "")
+                else:
+                    token = chunk.get("response", "")
+                if chunk.get("done"):
+                    self._record(chunk)
+                    yield token, chunk
+                    return
+                yield token, None
+
+    def embed(self, texts, model=EMBED_MODEL, timeout=None):
+        """Embedding vectors (lists of floats) for a string or a list of strings"""
+        if isinstance(texts, str):
+            texts = [texts]
+        body = {"model": model, "input": texts, "keep_alive": self.keep_alive}
+        return self.post("/api/embed", body, timeout=timeout).json().get("embeddings", [])
+
+    def _record(self, stats):
+        self.last_stats = stats
+        if LOG_TIMINGS:
+            print(f"  [LLM] {format_timings(stats)}")
+
+    def warm_up(self, model=None):
+        """Load the model with an empty prompt (generates nothing).
+
+        Uses the same options as real requests - a different num_ctx would
+        make Ollama load the model a second time on the first question.
+        """
+        body = self.payload("", model=model, max_tokens=0)
+        start = time.time()
+        try:
+            result = self.post("/api/generate", body, timeout=WARMUP_TIMEOUT).json()
+        except Exception as e:
+            print(f"(LLM warm-up failed: {error_message(e)})")
+            return False
+        load = result.get("load_duration", 0) / 1e9
+        print(f"✓ LLM {body['model']} ready (load {load:.2f}s, total {time.time() - start:.2f}s)")
+        return True
+
+    def warm_up_async(self, model=None):
+        """warm_up() in the background, e.g. while Vosk loads"""
+        thread = threading.Thread(target=self.warm_up, args=(model,), daemon=True)
+        thread.start()
+        return thread
+
+    def unload(self, model=None):
+        """Ask Ollama to drop the model from memory now"""
+        body = {"model": model or self.model, "prompt": "", "keep_alive": 0}
+        try:
+            self.post("/api/generate", body, timeout=10)
+        except Exception:
+            pass
+
+    def close(self):
+        if UNLOAD_ON_EXIT:
+            self.unload()
+        self.session.close()
+
+
+def format_timings(stats):
+    """Model load time vs. prompt evaluation vs. generation, from Ollama's
+    done-chunk (all durations there are in nanoseconds)"""
+    load = stats.get("load_duration", 0) / 1e9
+    prompt_s = stats.get("prompt_eval_duration", 0) / 1e9
+    gen_s = stats.get("eval_duration", 0) / 1e9
+    gen_tokens = stats.get("eval_count", 0)
+    rate = gen_tokens / gen_s if gen_s else 0.0
+    return (f"load {load:.2f}s | prompt {prompt_s:.2f}s ({stats.get('prompt_eval_count', 0)} tok)"
+            f" | generate {gen_s:.2f}s ({gen_tokens} tok, {rate:.1f} tok/s)")
+
+
+def format_stages(timings, stats):
+    """Per-question cost: retrieval stages (seconds) + Ollama's total time"""
+    parts = [f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in timings.items()]
+    parts.append(f"generate {stats.get('total_duration', 0) / 1e9:.2f}s")
+    return " | ".join(parts)
+
+
+def error_message(e):
+    """Speakable message for an exception from the client"""
+    if isinstance(e, requests.exceptions.ConnectionError):
+        return "Ollama not running. Start it with: ollama serve"
+    if isinstance(e, requests.exceptions.Timeout):
+        return "Response timed out. Try a simpler question."
+    return f"Error: {str(e)}"
+
+
+# Process-wide client, created on first use
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OllamaClient()
+        return _client
+
+def close_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+class ReplyStream:
+    """Iterate over the sentences of a streamed reply as they arrive.
+
+    Anything after "ACTION:" is not spoken; it ends up in .action once the
+    iteration is over. .text holds the spoken part.
+
+        reply = ReplyStream(prompt)
+        for sentence in reply:
+            speak(sentence)
+        if reply.action:
+            handle_action(reply.action)
+
+    max_tokens is the budget: if the model hits it mid-sentence, the
+    unfinished fragment is dropped instead of being read out. Leaving the
+    loop early (e.g. the user interrupted) closes the HTTP stream, which
+    stops the generation, and on_complete is not called.
+    """
+
+    def __init__(self, prompt, max_tokens=OLLAMA_MAX_TOKENS, client=None, on_complete=None, **kwargs):
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.client = client or get_client()
+        self.on_complete = on_complete
+        self.kwargs = kwargs
+        self.text = ""
+        self.action = ""
+        self.stats = {}
+        self.error = None
+
+    def __iter__(self):
+        splitter = SentenceSplitter()
+        in_action = False
+        spoken = []
+        finished = False
+
+        try:
+            for token, final in self.client.stream(self.prompt, max_tokens=self.max_tokens, **self.kwargs):
+                if final is not None:
+                    self.stats = final
+                if in_action:
+                    self.action += token
+                    continue
+
+                if "ACTION:" in splitter.buffer + token:
+                    before, after = (splitter.buffer + token).split("ACTION:", 1)
+                    splitter.buffer = ""
+                    in_action = True
+                    self.action = after
+                    for sentence in splitter.feed(before + "\n") + [splitter.flush()]:
+                        if sentence:
+                            spoken.append(sentence)
+                            yield sentence
+                    continue
+
+                for sentence in splitter.feed(token):
+                    spoken.append(sentence)
+                    yield sentence
+
+            rest = splitter.flush()
+            truncated = self.stats.get("done_reason") == "length"
+            if rest and not (truncated and spoken):
+                spoken.append(rest)
+                yield rest
+            finished = True
+
+        except Exception as e:
+            self.error = e
+            message = error_message(e)
+            spoken.append(message)
+            yield message
+        finally:
+            self.text = " ".join(spoken)
+            self.action = self.action.strip()
+            if self.on_complete is not None and self.error is None and finished:
+                self.on_complete(self)
+
+
+class ChatSession:
+    """Multi-turn conversation over /api/chat with a fixed system message.
+
+    The system message is sent byte-for-byte identical every turn, so
+    Ollama only evaluates that prefix once per loaded model and reuses its
+    cache afterwards - instead of re-reading the whole preamble for every
+    question. Only the last `max_turns` exchanges are kept, which bounds
+    the prompt (and num_ctx) no matter how long the session runs.
+
+    With a `cache` (response_cache.ResponseCache) a repeated standalone
+    question is answered from the cache without calling the model at all.
+    Follow-ups ("and its population?") and answers grounded in knowledge-base
+    context depend on more than the question, so they neither hit nor fill
+    the cache. Entries are scoped to this model + system prompt. With a
+    `retriever` (rag_retriever.Retriever) knowledge-base chunks are added
+    to the current question only - they never go into the history, so the
+    cached prefix stays the same.
+    """
+
+    def __init__(self, system_prompt, model=None, client=None, max_turns=HISTORY_TURNS,
+                 cache=None, retriever=None):
+        self.system = {"role": "system", "content": system_prompt}
+        self.model = model
+        self.client = client
+        self.cache = cache
+        self.retriever = retriever
+        if cache is not None:
+            self.cache_scope = cache.fingerprint(model or (client.model if client else OLLAMA_MODEL),
+                                                 system_prompt)
+        self.history = collections.deque(maxlen=max_turns * 2)
+        self._lock = threading.Lock()
+
+    def messages(self, user_text, context=""):
+        if context:
+            user_text = (f"Use this background information if it is relevant:\n{context}\n\n"
+                         f"Question: {user_text}")
+        with self._lock:
+            return [self.system] + list(self.history) + [{"role": "user", "content": user_text}]
+
+    def stream(self, user_text, max_tokens=OLLAMA_MAX_TOKENS, **kwargs):
+        """ReplyStream for the next turn; the exchange is added to the
+        history once the reply has been read to the end"""
+        context, timings = "", {}
+        with self._lock:
+            # the first question can't refer back to anything
+            use_cache = self.cache is not None and (not self.history or self.cache.standalone(user_text))
+
+        # Retrieval first: an answer grounded in the knowledge base is neither
+        # served from nor stored in the cache
+        if self.retriever is not None:
+            context, timings = self.retriever.context(user_text)
+            if context:
+                use_cache = False
+
+        def remember(reply):
+            content = reply.text
+            if reply.action:
+                content += "\nACTION: " + reply.action
+            with self._lock:
+                self.history.append({"role": "user", "content": user_text})
+                self.history.append({"role": "assistant", "content": content})
+            if use_cache:
+                self.cache.put_reply(user_text, reply, self.cache_scope)
+            if LOG_TIMINGS and timings:
+                print(f"  [Stages] {format_stages(timings, reply.stats)}")
+
+        if use_cache:
+            hit = self.cache.get(user_text, self.cache_scope)
+            if hit is not None:
+                remember(hit)  # keep the conversation coherent
+                return hit
+
+        return ReplyStream(None, messages=self.messages(user_text, context), model=self.model,
+                           max_tokens=max_tokens, client=self.client,
+                           on_complete=remember, **kwargs)
+
+    def reset(self):
+        with self._lock:
+            self.history.clear()
@@ -2,23 +2,21 @@ import queue
 import sounddevice as sd
 import vosk
 import json
-import pyttsx3
-import requests
+from llm_client import get_client
+from tts_worker import SpeechWorker
 from datetime import datetime
 
-# === Voice Engine ===
-engine = pyttsx3.init()
-engine.setProperty('rate', 170)
-engine.setProperty('volume', 1.0)
+# === Voice Engine (own thread, speak() doesn't block) ===
+speech = SpeechWorker(rate=170, volume=1.0)
+speech.start()
 
 def speak(text):
-    print("Jarvis:", text)
-    engine.say(text)
-    engine.runAndWait()
+    speech.say(text)
 
 # === Speech Recognition (Offline via Vosk) ===
 MODEL_PATH = "D:\Jarvis\models\vosk\vosk-model-small-en-us-0.15"
 sample_rate = 16000
+get_client().warm_up_async("mistral:7b")  # LLM loads while Vosk does
 model = vosk.Model(MODEL_PATH)
 q = queue.Queue()
 
@@ -30,6 +28,9 @@ def listen():
                            channels=1, callback=callback):
         rec = vosk.KaldiRecognizer(model, sample_rate)
         speak("Listening...")
+        speech.wait()
+        while not q.empty():  # drop our own voice
+            q.get_nowait()
         while True:
             data = q.get()
             if rec.AcceptWaveform(data):
@@ -42,13 +43,8 @@ def listen():
 # === Local LLM (Ollama) ===
 def generate_reply(prompt):
     try:
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={"model": "mistral::7b", "prompt": prompt},
-            timeout=300
-        )
-        data = response.json()
-        return data.get("response", "I couldn’t generate a response.")
+        text = get_client().generate(prompt, model="mistral:7b", timeout=300)
+        return text or "I couldn’t generate a response."
     except Exception as e:
         print("Error:", e)
         return "Local model unavailable."
@@ -57,11 +53,13 @@ def generate_reply(prompt):
 def main():
     speak("Jarvis is fully operational and offline.")
     while True:
+        speech.wait()  # finish talking before listening again
         query = listen()
         if not query:
             continue
         if "stop" in query or "exit" in query:
             speak("Goodbye Neil.")
+            speech.wait()
             break
         elif "time" in query:
             speak("The time is " + datetime.now().strftime("%I:%M %p"))
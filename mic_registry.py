@@ -0,0 +1,144 @@
+# mic_registry.py - Probe microphones once and remember the one that works
+#
+# Opening a test stream on every input device each time we listen gets slow
+# with 20+ devices (docking stations). The registry probes once, saves the
+# chosen device to disk per host API, and only probes again when opening
+# the cached device actually fails.
+import os
+import json
+import pyaudio
+
+# -------- CONFIG ----------
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".jarvis_mic_cache.json")
+PROBE_RATES = [16000, 22050, 44100, 48000]
+RATE = 16000
+CHUNK = 4096
+# ---------------------------
+
+
+class MicRegistry:
+    """Cached input-device lookup for one PyAudio instance"""
+
+    def __init__(self, pa, cache_path=CACHE_PATH):
+        self.pa = pa
+        self.cache_path = cache_path
+        self.device = None
+
+    def host_api(self):
+        try:
+            return self.pa.get_default_host_api_info()['name']
+        except Exception:
+            return "default"
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _save_cache(self, cache):
+        try:
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump(cache, f, indent=2)
+        except Exception as e:
+            print(f"(could not save mic cache: {e})")
+
+    def get_device(self):
+        """Chosen device as {name, index, rates}, or None if no mic works.
+
+        Uses memory, then the disk cache, and only probes if neither has one.
+        """
+        if self.device is not None:
+            return self.device
+        return self.cached() or self.probe()
+
+    def cached(self):
+        """Device from the disk cache if it is still plugged in, without probing"""
+        cached = self._load_cache().get(self.host_api())
+        if cached:
+            index = self._find_by_name(cached)
+            if index is not None:
+                self.device = dict(cached, index=index)
+                print(f"✓ Using microphone: {self.device['name']} (cached)")
+                return self.device
+        return None
+
+    def _find_by_name(self, cached):
+        """Index of the cached device - it may have moved after a replug.
+
+        Only reads device info, never opens a stream.
+        """
+        count = self.pa.get_device_count()
+        index = cached.get('index')
+        try:
+            if index is not None and index < count:
+                info = self.pa.get_device_info_by_index(index)
+                if info['name'] == cached['name'] and info['maxInputChannels'] > 0:
+                    return index
+            for i in range(count):
+                info = self.pa.get_device_info_by_index(i)
+                if info['name'] == cached['name'] and info['maxInputChannels'] > 0:
+                    return i
+        except Exception:
+            pass
+        return None
+
+    def probe(self):
+        """Open a test stream on each input device (default first) and cache the winner"""
+        candidates = []
+        try:
+            candidates.append(self.pa.get_default_input_device_info()['index'])
+        except Exception:
+            pass
+        candidates += [i for i in range(self.pa.get_device_count()) if i not in candidates]
+
+        for i in candidates:
+            try:
+                info = self.pa.get_device_info_by_index(i)
+                if info['maxInputChannels'] <= 0:
+                    continue
+                test_stream = self.pa.open(
+                    format=pyaudio.paInt16, channels=1, rate=RATE,
+                    input=True, frames_per_buffer=CHUNK, input_device_index=i
+                )
+                test_stream.close()
+            except:
+                continue
+
+            print(f"✓ Using microphone: {info['name']}")
+            return self.remember(i)
+
+        self.device = None
+        return None
+
+    def remember(self, index):
+        """Store a device (e.g. picked by the user) as the cached choice"""
+        info = self.pa.get_device_info_by_index(index)
+        self.device = {
+            "name": info['name'],
+            "index": index,
+            "rates": self._supported_rates(index),
+        }
+        cache = self._load_cache()
+        cache[self.host_api()] = self.device
+        self._save_cache(cache)
+        return self.device
+
+    def _supported_rates(self, index):
+        rates = []
+        for rate in PROBE_RATES:
+            try:
+                if self.pa.is_format_supported(rate, input_device=index, input_channels=1,
+                                               input_format=pyaudio.paInt16):
+                    rates.append(rate)
+            except ValueError:
+                continue
+        return rates
+
+    def invalidate(self):
+        """Forget the chosen device (call when opening it failed)"""
+        self.device = None
+        cache = self._load_cache()
+        if cache.pop(self.host_api(), None) is not None:
+            self._save_cache(cache)
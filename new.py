@@ -9,14 +9,16 @@ import threading
 import tkinter as tk
 import math
 import random
-import pyttsx3
-import pyaudio
 from vosk import Model, KaldiRecognizer
+from audio_capture import get_capture
+from wake_word import WakeWordSpotter
+from llm_client import ReplyStream, get_client
+from response_cache import get_cache, scoped_prompt
+from tts_worker import SpeechWorker
 
 # --- 1. CONFIGURATION (Same as before) ---
 VOSK_MODEL_DIR = "D:/Jarvis/models/vosk/vosk-model-small-en-us-0.15" # Check your path!
 OLLAMA_MODEL = "mistral:7b"
-OLLAMA_API_URL = "http://localhost:11434/api/generate"
 OLLAMA_MAX_TOKENS = 100
 CHUNK = 4096
 RATE = 16000
@@ -59,6 +61,9 @@ class JarvisGUI:
         self.morph_points, self.morph_offsets, self.morph_targets = 8, [0] * 8, [0] * 8
         self.current_state = "idle" # Track current state for color lookup
         
+        # Canvas items are created once and moved / recolored every frame
+        self._create_items()
+        
         # Dragging setup
         self.drag_data = {"x": 0, "y": 0}
         self.canvas.bind("<ButtonPress-1>", self.start_drag)
@@ -94,9 +99,37 @@ class JarvisGUI:
         self.current_state = "speaking"
         self.set_status("Speaking...")
     
-    # *** MODIFIED: Draw Morphing Circle with Gradient ***
+    def _create_items(self):
+        """One polygon per gradient layer plus the core, made once"""
+        self.morph_dirs = [(math.cos(j / self.morph_points * 2 * math.pi),
+                            math.sin(j / self.morph_points * 2 * math.pi))
+                           for j in range(self.morph_points)]
+        flat = [self.center_x, self.center_y] * self.morph_points
+        layers = max(len(colors) for colors in COLOR_MAP.values())
+        # Inner (opaque) layer first, so the outer glow layers sit on top of it
+        self.layer_items = [self.canvas.create_polygon(flat, smooth=True) for _ in range(layers)]
+        self.core_item = self.canvas.create_oval(0, 0, 0, 0, fill="#FFFFFF", outline="")
+        self.drawn_state = None
+    
+    def _color_layers(self, colors):
+        """Apply a state's gradient colors to the layer items"""
+        for i, item in enumerate(self.layer_items):
+            if i >= len(colors):
+                self.canvas.itemconfig(item, state="hidden")
+                continue
+            # The innermost shape should be opaque (index 0)
+            if i == 0:
+                 fill_color = colors[i]
+                 outline_width = 2
+            else:
+                 # Outer shapes provide the gradient / glow effect
+                 fill_color = ""
+                 outline_width = (len(colors) - i) * 3
+            self.canvas.itemconfig(item, fill=fill_color, outline=colors[i],
+                                   width=outline_width, state="normal")
+    
+    # *** MODIFIED: Draw Morphing Circle with Gradient (moves the existing items) ***
     def draw_morphing_circle(self):
-        self.canvas.delete("all")
         
         # Update morph offsets smoothly
         for i in range(self.morph_points):
@@ -108,56 +141,39 @@ class JarvisGUI:
         if self.listening:
             current_radius += math.sin(self.angle * 2) * 10
         
-        # --- Draw Concentric Gradient ---
+        # --- Concentric Gradient ---
         colors = COLOR_MAP[self.current_state]
+        if self.drawn_state != self.current_state:
+            # Recolor only when the state changed
+            self.drawn_state = self.current_state
+            self._color_layers(colors)
         
-        # The gradient is created by drawing a stack of transparent ovals
-        # Each oval's size is based on the morphing shape
-        
+        # The gradient is a stack of morphing shapes, each a bit smaller
         for i in range(len(colors)):
-            # Draw from inner to outer
+            # From inner to outer
             scale = 1.0 - (i * 0.2) 
             
             # Recalculate points for a smoother, layered morph
             points = []
-            for j in range(self.morph_points):
-                angle = (j / self.morph_points) * 2 * math.pi
-                
+            for j, (dx, dy) in enumerate(self.morph_dirs):
                 # Add jiggle when thinking
                 jiggle = math.sin(self.angle * 3 + j) * 5 * scale if self.thinking else 0
                 
                 radius = current_radius * scale + self.morph_offsets[j] * scale + jiggle
                 
-                x = self.center_x + radius * math.cos(angle)
-                y = self.center_y + radius * math.sin(angle)
-                points.extend([x, y])
+                points.extend([self.center_x + radius * dx, self.center_y + radius * dy])
             
-            # The innermost shape should be opaque (index 0)
-            if i == 0:
-                 fill_color = colors[i]
-                 outline_width = 2
-            else:
-                 # Outer shapes provide the gradient / glow effect
-                 fill_color = ""
-                 outline_width = (len(colors) - i) * 3
-                 
-            self.canvas.create_polygon(
-                points,
-                fill=fill_color,
-                outline=colors[i],
-                width=outline_width,
-                smooth=True
-            )
+            self.canvas.coords(self.layer_items[i], points)
 
-        # Draw a bright center core (unchanged)
+        # Bright center core (unchanged)
         core_size = 8
         if self.thinking:
             core_size += math.sin(self.angle * 5) * 3
         
-        self.canvas.create_oval(
+        self.canvas.coords(
+            self.core_item,
             self.center_x - core_size, self.center_y - core_size,
             self.center_x + core_size, self.center_y + core_size,
-            fill="#FFFFFF", outline=""
         )
         
     def animate(self):
@@ -173,9 +189,10 @@ class JarvisGUI:
 
 # --- 3. BACKEND CORE & 4. CONTROLLER (Same as before, simplified) ---
 
-# Global variables for speech engine and Vosk model
-tts = pyttsx3.init()
-tts.setProperty("rate", 180) 
+# Global variables for speech engine and Vosk model. One TTS thread owns
+# the engine - a thread per utterance on a shared engine is not safe
+speech = SpeechWorker(rate=180)
+speech.start()
 vosk_model = None
 
 def load_model():
@@ -187,35 +204,22 @@ def load_model():
         vosk_model = Model(VOSK_MODEL_DIR)
 
 def speak(text, gui: JarvisGUI):
-    """Speaks text and updates the GUI."""
-    print("JARVIS:", text)
-    gui.root.after(0, gui.set_speaking)
-    
-    def tts_thread():
-        tts.say(text)
-        tts.runAndWait()
-        gui.root.after(0, gui.set_idle)
-
-    threading.Thread(target=tts_thread, daemon=True).start()
+    """Queues text for the TTS thread (the GUI follows speech.on_state)."""
+    speech.say(text)
 
 def listen_once(gui: JarvisGUI, device_index=None):
     """Listens for a single phrase using Vosk."""
     if vosk_model is None: return ""
         
-    p = pyaudio.PyAudio()
-    stream = p.open(format=pyaudio.paInt16, channels=1, rate=RATE, input=True, frames_per_buffer=CHUNK, input_device_index=device_index)
+    capture = get_capture(device_index)
+    if capture is None: return ""
     rec = KaldiRecognizer(vosk_model, RATE)
     
     gui.root.after(0, gui.set_listening)
     print("Listening...")
 
-    for _ in range(0, int(RATE / CHUNK * 4)): 
-        try:
-            data = stream.read(CHUNK, exception_on_overflow=False)
-            if rec.AcceptWaveform(data): break
-        except Exception: break
-
-    stream.stop_stream(); stream.close(); p.terminate()
+    for data in capture.utterance(4):
+        if rec.AcceptWaveform(data): break
     
     final = rec.FinalResult()
     try:
@@ -224,19 +228,16 @@ def listen_once(gui: JarvisGUI, device_index=None):
         return text
     except Exception: return ""
 
-def query_ollama(prompt):
-    import requests
-    try:
-        response = requests.post(
-            OLLAMA_API_URL,
-            json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": False, "options": {"num_predict": OLLAMA_MAX_TOKENS}},
-            timeout=30
-        )
-        data = response.json()
-        return data.get("response", "Local model unavailable.").strip()
-    except Exception as e:
-        print(f"Ollama Error: {e}")
-        return "I am having trouble connecting to the local model."
+def stream_reply(template, question):
+    """Streamed reply to `question` through a {question} prompt template
+    (iterate for sentences); repeated questions come from the cache"""
+    cache = get_cache()
+    prompt, scope = scoped_prompt(OLLAMA_MODEL, template, question)
+    cached = cache.get(question, scope)
+    if cached is not None:
+        return cached
+    return ReplyStream(prompt, max_tokens=OLLAMA_MAX_TOKENS, model=OLLAMA_MODEL, timeout=30,
+                       on_complete=cache.remember(question, scope))
 
 def handle_action(action_text):
     command = WHITELISTED_ACTIONS.get(action_text)
@@ -253,20 +254,42 @@ class JarvisController:
         self.gui = gui
         self.mic_index = mic_index
         self.running = True
+        self.spotter = None
+        speech.on_state = lambda state: gui.root.after(
+            0, gui.set_speaking if state == "speaking" else gui.set_idle)
         threading.Thread(target=self.run_loop, daemon=True).start()
 
+    def wait_for_wake_word(self):
+        """Idle on a tiny-grammar keyword spotter until 'Jarvis' is heard"""
+        capture = get_capture(self.mic_index)
+        if capture is None:
+            time.sleep(1)
+            return False
+        if self.spotter is None or self.spotter.capture is not capture:
+            self.spotter = WakeWordSpotter(vosk_model, capture)
+        return self.spotter.wait()
+
     def run_loop(self):
+        get_client().warm_up_async(OLLAMA_MODEL)  # LLM loads while Vosk does
         try:
             load_model()
         except FileNotFoundError as e:
             self.gui.root.after(0, lambda: self.gui.set_status("ERROR: Model Missing!"))
             return
             
+        capture = get_capture(self.mic_index)
+        if capture is not None:
+            speech.attach_capture(capture)  # talking over JARVIS interrupts it
         speak("Jarvis system online. Ready to serve.", self.gui)
-        time.sleep(1)
 
         while self.running:
-            time.sleep(2) 
+            # Only record after the wake word instead of blindly every 2 s.
+            # Never while still talking - unless the user cut in, then
+            # they are already speaking
+            if speech.wait():
+                print("(interrupted - listening)")
+            elif not self.wait_for_wake_word():
+                continue
             user_text = listen_once(self.gui, self.mic_index)
             
             if not user_text.strip():
@@ -278,25 +301,24 @@ class JarvisController:
             if any(x in lower_text for x in ["exit", "shutdown", "goodbye"]):
                 self.running = False
                 speak("Goodbye. System shutting down.", self.gui)
-                self.gui.root.after(1000, self.gui.root.quit)
+                speech.wait(timeout=5)
+                self.gui.root.after(0, self.gui.root.quit)
                 break
 
             self.gui.root.after(0, self.gui.set_thinking)
             
-            prompt = f"You are a helpful and concise assistant named Jarvis. The user said: \"{user_text}\". Answer concisely. If the user asked to run a system action (like open notepad or list directory), output a single line starting with ACTION: followed by the action name exactly as defined in the list. Otherwise just answer normally."
-            response = query_ollama(prompt)
+            template = "You are a helpful and concise assistant named Jarvis. The user said: \"{question}\". Answer concisely. If the user asked to run a system action (like open notepad or list directory), output a single line starting with ACTION: followed by the action name exactly as defined in the list. Otherwise just answer normally."
+            reply = stream_reply(template, user_text)
             
-            if "ACTION:" in response:
-                parts = response.split("ACTION:", 1)
-                speech_text = parts[0].strip()
-                action_text = parts[1].strip()
-                
-                if speech_text: speak(speech_text, self.gui)
-                
-                action_result = handle_action(action_text)
-                if not speech_text: speak(action_result, self.gui)
-            else:
-                speak(response, self.gui)
+            # Speak each sentence as soon as it has been generated
+            for sentence in reply:
+                if speech.interrupted:
+                    break  # stops the generation too
+                speak(sentence, self.gui)
+            
+            if reply.action:
+                action_result = handle_action(reply.action)
+                if not reply.text: speak(action_result, self.gui)
                 
 # --- 5. MAIN EXECUTION ---
 if __name__ == "__main__":
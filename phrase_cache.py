@@ -0,0 +1,163 @@
+# phrase_cache.py - Fixed phrases rendered to audio once, played instantly
+#
+# "Executing.", "Done.", "Goodbye." ... were synthesized by pyttsx3 every
+# single time, competing with the LLM for CPU right when a command runs.
+# PhraseCache renders each one to a WAV file once (engine.save_to_file),
+# keyed by voice + rate + text, keeps the PCM in memory and plays it
+# through one output stream that stays open.
+import os
+import wave
+import hashlib
+import pyaudio
+
+# -------- CONFIG ----------
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".jarvis_phrases")
+PLAYBACK_BLOCK = 1024   # frames per write - also how quickly playback can be stopped
+
+# Everything the assistants say word for word
+PHRASES = [
+    "Jarvis ready.",
+    "Executing.",
+    "Done.",
+    "Failed.",
+    "Action not recognized.",
+    "Command executed successfully.",
+    "Goodbye.",
+    "Shutting down.",
+    "Listening...",
+    "Jarvis system online.",
+    "Jarvis system online. Ready to serve.",
+    "Jarvis system online. Say my name to activate.",
+    "Jarvis system online. Press Enter in the console to activate.",
+    "Goodbye, Neil.",
+    "Goodbye Neil.",
+    "Goodbye. System shutting down.",
+    "Interrupted. Shutting down.",
+    "An error occurred.",
+    "An unexpected error occurred.",
+    "System offline.",
+]
+# ---------------------------
+
+
+class Clip:
+    """Raw PCM of one rendered phrase"""
+
+    def __init__(self, frames, rate, width, channels):
+        self.frames = frames
+        self.rate = rate
+        self.width = width
+        self.channels = channels
+
+    @property
+    def format(self):
+        return (self.rate, self.width, self.channels)
+
+
+class PhraseCache:
+    """Renders phrases with a pyttsx3 engine and plays them back.
+
+    Must be used from the thread that owns the engine (SpeechWorker).
+    """
+
+    def __init__(self, engine, rate, phrases=PHRASES, cache_dir=CACHE_DIR):
+        self.engine = engine
+        self.cache_dir = cache_dir
+        self.clips = {}
+        self._pa = None
+        self._stream = None
+        self._stream_format = None
+
+        try:
+            voice = engine.getProperty("voice") or "default"
+        except Exception:
+            voice = "default"
+        self.voice = str(voice)
+        self.rate = rate
+        os.makedirs(cache_dir, exist_ok=True)
+        self.load(phrases)
+
+    def path(self, text):
+        key = hashlib.sha1(f"{self.voice}|{self.rate}|{text}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".wav")
+
+    def load(self, phrases):
+        """Read every phrase from disk, rendering the missing ones first"""
+        rendered = 0
+        for text in phrases:
+            path = self.path(text)
+            if not os.path.exists(path):
+                if not self._render(text, path):
+                    continue
+                rendered += 1
+            clip = self._read(path)
+            if clip is not None:
+                self.clips[text] = clip
+        if rendered:
+            print(f"✓ Rendered {rendered} fixed phrases to {self.cache_dir}")
+
+    def _render(self, text, path):
+        tmp = path + ".part.wav"
+        try:
+            self.engine.save_to_file(text, tmp)
+            self.engine.runAndWait()
+            os.replace(tmp, path)
+            return True
+        except Exception as e:
+            print(f"(could not pre-render '{text}': {e})")
+            return False
+
+    def _read(self, path):
+        # Drivers that don't write WAV (e.g. AIFF on macOS) just aren't cached
+        try:
+            with wave.open(path, "rb") as w:
+                return Clip(w.readframes(w.getnframes()), w.getframerate(),
+                            w.getsampwidth(), w.getnchannels())
+        except Exception:
+            return None
+
+    def get(self, text):
+        return self.clips.get(text.strip())
+
+    def _output(self, clip):
+        """The open output stream, reopened only if the clip format differs"""
+        if self._stream is not None and self._stream_format == clip.format:
+            return self._stream
+        self.close_stream()
+        if self._pa is None:
+            self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(
+            format=self._pa.get_format_from_width(clip.width),
+            channels=clip.channels,
+            rate=clip.rate,
+            output=True,
+            frames_per_buffer=PLAYBACK_BLOCK,
+        )
+        self._stream_format = clip.format
+        return self._stream
+
+    def play(self, clip, cancelled=lambda: False):
+        """Write the clip block by block; stops early once cancelled() is true"""
+        stream = self._output(clip)
+        step = PLAYBACK_BLOCK * clip.width * clip.channels
+        for i in range(0, len(clip.frames), step):
+            if cancelled():
+                return False
+            stream.write(clip.frames[i:i + step])
+        return True
+
+    def close_stream(self):
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
+            self._stream_format = None
+
+    def close(self):
+        self.close_stream()
+        if self._pa is not None:
+            self._pa.terminate()
+            self._pa = None
@@ -1,87 +1,161 @@
 import sys
 import math
-import random
+import time
 import pygame
+import numpy as np
+from frame_pacer import FramePacer
 
 # ---------------- CONFIG ----------------
 DOT_COUNT = 7000
 WIDTH, HEIGHT = 1280, 720
 BG_COLOR = (0, 0, 0)
 DOT_COLOR = (255, 255, 255)
-FPS = 400
+FPS = 60                  # while the window has focus
+IDLE_FPS = 5              # in the background / minimized
+SIM_FPS = 60              # the physics below is tuned per frame at this rate
+MAX_STEP = 4              # longer frames are split into steps this big (repulsion blows up past ~6)
 
 # Physics tuning — magnetic swarm feel
 CENTER_PULL = 0.015       # soft attraction to center
 MAG_REPULSION = 0.1     # magnetic push when too close
 MAG_RANGE = 55            # how far magnetic repulsion reaches
 VELOCITY_DAMP = 0.985     # smooth motion
+PAIR_BLOCK = 1 << 21      # candidate pairs checked per pass (bounds memory)
 
 PARTICLE_RADIUS = 2
 
 # ----------------------------------------
-class Dot:
-    __slots__ = ("x", "y", "vx", "vy")
-
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.vx = (random.random() - 0.5) * 0.2
-        self.vy = (random.random() - 0.5) * 0.2
-
-    def update(self, cx, cy):
+# Cells of the grid a cell's pairs are taken from: itself and the 4
+# "forward" cells, so each pair of neighbouring cells is visited once
+FORWARD_CELLS = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1))
+
+
+def neighbour_pairs(x, y, cell_size, block=PAIR_BLOCK):
+    """Yield (i, j) index arrays of every pair of points in the same or
+    adjacent grid cells - a superset of the pairs closer than cell_size.
+
+    The grid is rebuilt on each call: points are binned by sorting their
+    cell keys, so it costs O(n log n) plus the number of candidate pairs.
+    """
+    n = len(x)
+    if n < 2:
+        return
+    gx = np.floor((x - x.min()) / cell_size).astype(np.int64)
+    gy = np.floor((y - y.min()) / cell_size).astype(np.int64)
+    # a spare row keeps gy - 1 / gy + 1 from wrapping into the next column
+    rows = int(gy.max()) + 2
+    key = gx * rows + gy
+
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    pos = np.arange(n)
+
+    # for every point and forward cell: the slice of `order` to pair it with
+    starts, ends, owners = [], [], []
+    for ox, oy in FORWARD_CELLS:
+        k = sorted_key + ox * rows + oy
+        if (ox, oy) == (0, 0):
+            s = pos + 1   # later points of its own cell only
+        else:
+            s = np.searchsorted(sorted_key, k, side="left")
+        e = np.searchsorted(sorted_key, k, side="right")
+        starts.append(s)
+        ends.append(np.maximum(e, s))
+        owners.append(pos)
+    starts = np.concatenate(starts)
+    ends = np.concatenate(ends)
+    owners = np.concatenate(owners)
+    counts = ends - starts
+
+    # expand the slices into pairs, a block of about `block` pairs at a time
+    bounds = np.cumsum(counts)
+    first = 0
+    while first < len(counts):
+        last = int(np.searchsorted(bounds, bounds[first] - counts[first] + block, side="right"))
+        last = max(last, first + 1)
+        c = counts[first:last]
+        total = int(c.sum())
+        if total:
+            a = np.repeat(owners[first:last], c)
+            # ragged arange: starts[k], starts[k] + 1, ... for each slice
+            offset = np.arange(total) - np.repeat(np.cumsum(c) - c, c)
+            b = np.repeat(starts[first:last], c) + offset
+            yield order[a], order[b]
+        first = last
+
+
+class Swarm:
+    """All dots as arrays (x, y, vx, vy) - one NumPy op per step instead of
+    a Python call per dot"""
+
+    def __init__(self, count, w, h):
+        # same grid layout as before: row by row, centered in each cell
+        spacing = math.sqrt((w * h) / count)
+        cols = int(w / spacing)
+        rows = int(h / spacing)
+        i = np.arange(min(count, cols * rows))
+        self.x = (i % cols) * spacing + spacing * 0.5
+        self.y = (i // cols) * spacing + spacing * 0.5
+        self.vx = (np.random.random(len(i)) - 0.5) * 0.2
+        self.vy = (np.random.random(len(i)) - 0.5) * 0.2
+
+    def __len__(self):
+        return len(self.x)
+
+    def update(self, cx, cy, step=1.0):
+        """Move the dots by `step` SIM_FPS frames"""
         # --- soft attraction to center (magnetic field pull) ---
         dx = cx - self.x
         dy = cy - self.y
-        dist = math.sqrt(dx*dx + dy*dy) + 0.0001
-        self.vx += (dx/dist) * CENTER_PULL
-        self.vy += (dy/dist) * CENTER_PULL
+        dist = np.sqrt(dx*dx + dy*dy) + 0.0001
+        self.vx += (dx/dist) * (CENTER_PULL * step)
+        self.vy += (dy/dist) * (CENTER_PULL * step)
 
         # apply velocity damping
-        self.vx *= VELOCITY_DAMP
-        self.vy *= VELOCITY_DAMP
-
-        self.x += self.vx
-        self.y += self.vy
-
-    def magnet_collide(self, other):
-        dx = other.x - self.x
-        dy = other.y - self.y
-        dist = math.sqrt(dx*dx + dy*dy)
-        if dist == 0 or dist > MAG_RANGE:
-            return
-
-        # normalized direction
-        nx = dx / dist
-        ny = dy / dist
-
-        # magnetic inverse-square repulsion
-        force = MAG_REPULSION * (1 - dist / MAG_RANGE)
-
-        # apply equally
-        self.vx -= nx * force
-        self.vy -= ny * force
-        other.vx += nx * force
-        other.vy += ny * force
-
-
-# ----------------------------------------
-def init_dots(count, w, h):
-    dots = []
-    spacing = math.sqrt((w * h) / count)
-    cols = int(w / spacing)
-    rows = int(h / spacing)
-    i = 0
-    for r in range(rows):
-        for c in range(cols):
-            if i >= count:
-                break
-            x = c * spacing + spacing * 0.5
-            y = r * spacing + spacing * 0.5
-            dots.append(Dot(x, y))
-            i += 1
-        if i >= count:
-            break
-    return dots
+        damp = VELOCITY_DAMP ** step
+        self.vx *= damp
+        self.vy *= damp
+
+        self.x += self.vx * step
+        self.y += self.vy * step
+
+    def magnet_collide(self, step=1.0):
+        """Repulsion between every pair of dots within MAG_RANGE, found with
+        a uniform grid of MAG_RANGE-sized cells (`step` as in update)"""
+        n = len(self)
+        ax = np.zeros(n)
+        ay = np.zeros(n)
+        for i, j in neighbour_pairs(self.x, self.y, MAG_RANGE):
+            dx = self.x[j] - self.x[i]
+            dy = self.y[j] - self.y[i]
+            dist = np.sqrt(dx*dx + dy*dy)
+            near = (dist > 0) & (dist <= MAG_RANGE)
+            i, j, dx, dy, dist = i[near], j[near], dx[near], dy[near], dist[near]
+
+            # magnetic inverse-square repulsion, along the normalized direction
+            scale = (MAG_REPULSION * step) * (1 - dist / MAG_RANGE) / dist
+            fx = dx * scale
+            fy = dy * scale
+
+            # apply equally
+            ax -= np.bincount(i, fx, n)
+            ay -= np.bincount(i, fy, n)
+            ax += np.bincount(j, fx, n)
+            ay += np.bincount(j, fy, n)
+        self.vx += ax
+        self.vy += ay
+
+    def draw(self, frame, color):
+        """Set the 2x2 pixels of every dot in a (w, h) pixel array"""
+        w, h = frame.shape
+        xi = self.x.astype(np.int32)
+        yi = self.y.astype(np.int32)
+        for ox in (0, 1):
+            for oy in (0, 1):
+                px = xi + ox
+                py = yi + oy
+                inside = (px >= 0) & (px < w) & (py >= 0) & (py < h)
+                frame[px[inside], py[inside]] = color
 
 
 # ----------------------------------------
@@ -91,46 +165,61 @@ def main():
 
     screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
     pygame.display.set_caption("Magnetic Swarm HUD — Python")
-    clock = pygame.time.Clock()
+    pacer = FramePacer("Swarm", rates={"active": FPS, "idle": IDLE_FPS}, state="active")
 
-    dots = init_dots(DOT_COUNT, WIDTH, HEIGHT)
+    swarm = Swarm(DOT_COUNT, WIDTH, HEIGHT)
+    # the whole frame is drawn into this array and blitted once
+    frame = np.zeros((WIDTH, HEIGHT), dtype=np.uint32)
+    bg = screen.map_rgb(BG_COLOR)
+    fg = screen.map_rgb(DOT_COLOR)
 
+    last = time.perf_counter()
     running = True
-    while running:
-        dt = clock.tick(FPS) / 1000.0
-
+    while running and pacer.wait():
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type in (pygame.WINDOWFOCUSLOST, pygame.WINDOWMINIMIZED):
+                pacer.set_state("idle")
+            elif event.type in (pygame.WINDOWFOCUSGAINED, pygame.WINDOWRESTORED):
+                pacer.set_state("active")
             elif event.type == pygame.VIDEORESIZE:
                 WIDTH, HEIGHT = event.w, event.h
                 screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
+                frame = np.zeros((WIDTH, HEIGHT), dtype=np.uint32)
 
+        pacer.begin_frame()
         cx, cy = WIDTH/2, HEIGHT/2
+        # elapsed time in SIM_FPS frames: the same motion at 60 FPS and idle
+        now = time.perf_counter()
+        step = min((now - last) * SIM_FPS, SIM_FPS / IDLE_FPS)
+        last = now
+        substeps = max(1, math.ceil(step / MAX_STEP))
 
-        # --- update particles ---
-        for d in dots:
-            d.update(cx, cy)
+        for _ in range(substeps):
+            # --- update particles ---
+            swarm.update(cx, cy, step / substeps)
 
-        # --- magnetic repulsion (local interactions only) ---
-        for i in range(len(dots)):
-            a = dots[i]
-            # only check neighbors up to some range in index for perf
-            for j in range(i+1, min(len(dots), i+25)):
-                b = dots[j]
-                a.magnet_collide(b)
+            # --- magnetic repulsion (local interactions only) ---
+            swarm.magnet_collide(step / substeps)
 
         # --- drawing ---
-        screen.fill(BG_COLOR)
-
-        for d in dots:
-            screen.fill(DOT_COLOR, (int(d.x), int(d.y), 2, 2))
+        frame.fill(bg)
+        swarm.draw(frame, fg)
+        pygame.surfarray.blit_array(screen, frame)
 
         pygame.display.flip()
+        pacer.end_frame()
+
+        if pacer.frames % 60 == 0:
+            s = pacer.stats()
+            pygame.display.set_caption(f"Magnetic Swarm HUD — Python | {len(swarm)} dots | "
+                                       f"{s['fps']:.0f} FPS, {s['mean_ms']:.1f} ms/frame")
 
+    pacer.report()
     pygame.quit()
     sys.exit()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
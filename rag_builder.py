@@ -1,19 +1,382 @@
 # rag_builder.py - Standalone utility to build and save the RAG vector index
+#
+# Incremental by default: a manifest (path, mtime, size, content hash and
+# chunk ids per file) lives next to the index, so only new or changed
+# files are split and embedded again and the chunks of deleted files are
+# removed. Run with --rebuild to start over from scratch.
+#
+# Embedding goes through batch_embedder.BatchEmbeddings: batched requests
+# to /api/embed, several at a time, with progress. Vectors are kept in a
+# persistent hash -> embedding store, so nothing is embedded twice.
+#
+# Chunks are deduplicated: a chunk's id is the hash of its normalized
+# text, so boilerplate repeated across files is one vector whose
+# "sources" metadata lists every file it appears in.
+#
+# Ingestion is streamed: files are found lazily, read READ_BLOCK bytes at a
+# time, split SEGMENT_CHARS of text at a time, and the chunks go to the
+# index INGEST_BATCH at a time. Memory stays flat however big KB_PATH is.
+#
+# Splitting runs in a process pool (--workers N) and the whole parse side
+# runs in a producer thread, so files are being split while the previous
+# batch is being embedded.
 
 import os
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
+import json
+import codecs
+import hashlib
+import time
+import queue
+import argparse
+import threading
+import collections
+from concurrent.futures import ProcessPoolExecutor
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_ollama import OllamaEmbeddings
 from langchain_community.vectorstores import Chroma
+from batch_embedder import BatchEmbeddings, chunk_hash, EMBED_BATCH_SIZE, EMBED_WORKERS
 
 # --- Configuration (Must match your main JARVIS script) ---
 KB_PATH = "D:/Jarvis/kb" 
 OLLAMA_EMBEDDING_MODEL = "nomic-embed-text:latest" 
-OLLAMA_API_URL = "http://localhost:11434/api/generate"
+OLLAMA_HOST = "http://localhost:11434"  # server root - embeddings go to /api/embed
 RAG_COLLECTION_NAME = "jarvis_kb_collection"
 RAG_PERSIST_DIR = "./chroma_db"
+MANIFEST_PATH = os.path.join(RAG_PERSIST_DIR, "jarvis_manifest.json")
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+READ_BLOCK = 1 << 20          # bytes read from a file at a time
+SEGMENT_CHARS = 64 * 1024     # text handed to the splitter at a time
+INGEST_BATCH = 256            # chunks held in memory / added to Chroma per call
+PARSE_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # splitter processes (--workers)
 
-def build_rag_index():
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+def save_manifest(manifest):
+    """Written atomically - a crash mid-write must not lose track of the index"""
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, MANIFEST_PATH)
+
+def iter_kb_files():
+    """(relative path, absolute path) of every .txt under KB_PATH, found lazily"""
+    for root, dirs, names in os.walk(KB_PATH):
+        dirs.sort()
+        for name in sorted(names):
+            if name.lower().endswith(".txt"):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, KB_PATH).replace(os.sep, "/"), path
+
+def scan_kb():
+    """{relative path: (absolute path, mtime, size)} for every .txt in KB_PATH"""
+    files = {}
+    for rel, path in iter_kb_files():
+        st = os.stat(path)
+        files[rel] = (path, st.st_mtime, st.st_size)
+    return files
+
+def iter_segments(path, h):
+    """Text of a file in pieces of about SEGMENT_CHARS, cut at paragraph or
+    line breaks so the splitter never sees half a sentence. Feeds the raw
+    bytes into the hash `h` on the way."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_BLOCK), b""):
+            h.update(block)
+            buffer += decoder.decode(block)
+            while len(buffer) >= SEGMENT_CHARS:
+                cut = -1
+                for sep in ("\n\n", "\n", " "):
+                    cut = buffer.rfind(sep, SEGMENT_CHARS // 2, SEGMENT_CHARS)
+                    if cut != -1:
+                        break
+                if cut == -1:
+                    cut = SEGMENT_CHARS
+                yield buffer[:cut]
+                buffer = buffer[cut:]
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield buffer
+
+# Splitter of each pool process, built once by the pool initializer
+_worker_splitter = None
+
+def _init_splitter(chunk_size, chunk_overlap):
+    global _worker_splitter
+    _worker_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+def _split_segment(segment):
+    """[(chunk text, content id)] - hashing runs in the workers as well"""
+    return [(text, chunk_hash(text)) for text in _worker_splitter.split_text(segment)]
+
+class _Done:
+    """Result of a split that ran in this process (workers=1)"""
+    def __init__(self, value):
+        self.value = value
+    def result(self):
+        return self.value
+
+def iter_chunks(files, manifest_files, workers=PARSE_WORKERS, failed=None):
+    """(Document, id) for every chunk of the given (rel, path) files.
+
+    Segments are read here and split by `workers` processes; at most
+    2 * workers segments are in flight, and results come back in order. The
+    id of a chunk is the hash of its normalized text; a chunk repeated
+    within a file is yielded once. A file's manifest entry (mtime, size,
+    hash, chunk ids) is filled in once all of its chunks have been yielded.
+    A file that can't be read to the end gets no entry; the ids of the
+    chunks already yielded for it go into the `failed` set (see drop_failed).
+    """
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_splitter,
+                                   initargs=(CHUNK_SIZE, CHUNK_OVERLAP))
+    else:
+        _init_splitter(CHUNK_SIZE, CHUNK_OVERLAP)
+    split = pool.submit if pool else (lambda fn, segment: _Done(fn(segment)))
+
+    pending = collections.deque()  # ("split", rel, path, future) / ("done", rel, entry) / ("failed", rel, None)
+    ids = {}
+
+    def drain_one():
+        kind, rel, *rest = pending.popleft()
+        if kind == "split":
+            path, future = rest
+            for text, chunk_id in future.result():
+                if chunk_id in ids[rel]:
+                    continue
+                ids[rel][chunk_id] = None  # ordered set
+                yield Document(page_content=text, metadata={"source": path, "sources": rel}), chunk_id
+        elif kind == "done":
+            manifest_files[rel] = dict(rest[0], ids=list(ids.pop(rel)))
+        else:
+            partial = ids.pop(rel, {})
+            if failed is not None:
+                failed.update(partial)
+
+    try:
+        for rel, path in files:
+            ids[rel] = {}
+            try:
+                st = os.stat(path)
+                h = hashlib.sha256()
+                for segment in iter_segments(path, h):
+                    pending.append(("split", rel, path, split(_split_segment, segment)))
+                    while len(pending) >= 2 * workers:
+                        yield from drain_one()
+            except OSError as e:
+                print(f"⚠️ Skipping {rel}: {e}")
+                pending.append(("failed", rel, None))
+                continue
+            pending.append(("done", rel, {"mtime": st.st_mtime, "size": st.st_size,
+                                          "sha256": h.hexdigest()}))
+        while pending:
+            yield from drain_one()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+def produce(items, size=INGEST_BATCH * 4):
+    """Run a generator in a background thread, handing its items over
+    through a bounded queue - the producer runs ahead of the consumer by at
+    most `size` items."""
+    q = queue.Queue(maxsize=size)
+    stop = threading.Event()
+    end = object()
+
+    def run():
+        try:
+            for item in items:
+                while not stop.is_set():
+                    try:
+                        q.put(item, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            q.put(end)
+        except BaseException as e:
+            q.put(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    try:
+        while True:
+            item = q.get()
+            if item is end:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def index_chunks(db, chunks):
+    """Add (Document, id) pairs to the store INGEST_BATCH at a time.
+
+    Parsing (the chunks generator) keeps going in a producer thread while
+    each batch is being embedded. A chunk already added in this run is
+    skipped - its other sources are filled in by fix_sources().
+    Returns (chunks seen, unique chunks added).
+    """
+    total = 0
+    seen = set()
+    for batch in batched(produce(chunks), INGEST_BATCH):
+        total += len(batch)
+        unique = []
+        for doc, chunk_id in batch:
+            if chunk_id not in seen:
+                seen.add(chunk_id)
+                unique.append((doc, chunk_id))
+        if unique:
+            db.add_documents([doc for doc, _ in unique], ids=[chunk_id for _, chunk_id in unique])
+    return total, len(seen)
+
+def fix_sources(db, manifest_files, chunk_ids=None):
+    """Give chunks that appear in several files a "sources" list of all of
+    them. With chunk_ids, only those chunks are rewritten - including ones
+    that are down to a single file again; by default every shared chunk.
+    The vectors come from the embedding store, so nothing is embedded again."""
+    refs = collections.defaultdict(list)
+    for rel, entry in manifest_files.items():
+        for chunk_id in entry["ids"]:
+            if chunk_ids is None or chunk_id in chunk_ids:
+                refs[chunk_id].append(rel)
+    rewrite = [(chunk_id, sorted(rels)) for chunk_id, rels in refs.items()
+               if len(rels) > 1 or chunk_ids is not None]
+
+    for batch in batched(rewrite, INGEST_BATCH):
+        stored = db.get(ids=[chunk_id for chunk_id, _ in batch])
+        texts = dict(zip(stored["ids"], stored["documents"]))
+        batch = [(chunk_id, rels) for chunk_id, rels in batch if chunk_id in texts]
+        db.update_documents(
+            ids=[chunk_id for chunk_id, _ in batch],
+            documents=[Document(page_content=texts[chunk_id],
+                                metadata={"source": os.path.join(KB_PATH, rels[0]),
+                                          "sources": "|".join(rels)})
+                       for chunk_id, rels in batch])
+    return sum(1 for _, rels in rewrite if len(rels) > 1)
+
+def drop_failed(db, failed, manifest_files):
+    """Delete the chunks of files that failed partway through - they are in
+    the store but no manifest entry points at them, so no later run would
+    ever remove them. Chunks another file also has are kept."""
+    used = {chunk_id for entry in manifest_files.values() for chunk_id in entry["ids"]}
+    orphaned = list(failed - used)
+    if orphaned:
+        db.delete(ids=orphaned)
+        print(f"🗑️ Removed {len(orphaned)} chunks of unreadable files")
+
+def update_rag_index(workers=PARSE_WORKERS):
+    """Re-embed only the files that changed since the last run"""
+    print("=" * 50)
+    print(" RAG Knowledge Base Builder (incremental)")
+    print("=" * 50)
+
+    if not os.path.isdir(KB_PATH):
+        print(f"❌ ERROR: Knowledge Base directory not found: {KB_PATH}")
+        print("Please create the folder and add .txt files.")
+        return
+
+    manifest = load_manifest()
+    if manifest is None:
+        # No manifest = we can't tell which chunks belong to which file
+        print("No manifest found - doing a full build first.")
+        return build_rag_index(workers)
+
+    start = time.time()
+    old_files = manifest.get("files", {})
+    current = scan_kb()
+
+    # 1. Work out what changed. mtime+size decide whether a file is even
+    # read; the hash catches "touched but identical" files.
+    changed, unchanged = [], 0
+    for rel, (path, mtime, size) in current.items():
+        entry = old_files.get(rel)
+        if entry and entry["mtime"] == mtime and entry["size"] == size:
+            unchanged += 1
+            continue
+        digest = file_hash(path)
+        if entry and entry["sha256"] == digest:
+            entry["mtime"], entry["size"] = mtime, size
+            unchanged += 1
+            continue
+        changed.append((rel, path, mtime, size, digest))
+    removed = [rel for rel in old_files if rel not in current]
+
+    print(f"{len(current)} files: {len(changed)} new/changed, {len(removed)} removed, {unchanged} unchanged")
+    if not changed and not removed:
+        save_manifest(manifest)
+        print("✅ Index is up to date.")
+        return
+
+    embeddings = BatchEmbeddings(model=OLLAMA_EMBEDDING_MODEL, host=OLLAMA_HOST,
+                                 batch_size=EMBED_BATCH_SIZE, workers=EMBED_WORKERS)
+    db = Chroma(
+        collection_name=RAG_COLLECTION_NAME,
+        embedding_function=embeddings,
+        persist_directory=RAG_PERSIST_DIR
+    )
+
+    # 2. Drop the chunks of removed and changed files - unless another
+    # file still contains the same chunk
+    stale_ids = set()
+    for rel in removed:
+        stale_ids.update(old_files.pop(rel)["ids"])
+    for rel, *_ in changed:
+        if rel in old_files:
+            stale_ids.update(old_files.pop(rel)["ids"])
+    still_used = {chunk_id for entry in old_files.values() for chunk_id in entry["ids"]}
+    orphaned = list(stale_ids - still_used)
+    if orphaned:
+        db.delete(ids=orphaned)
+        print(f"🗑️ Removed {len(orphaned)} old chunks")
+
+    # 3. Stream the changed files through the splitter into the index
+    files = [(rel, path) for rel, path, *_ in changed]
+    failed = set()
+    total, unique = index_chunks(db, iter_chunks(files, old_files, workers=workers, failed=failed))
+    drop_failed(db, failed, old_files)
+
+    # 4. Source lists of the chunks whose set of files may have changed
+    touched = stale_ids | failed | {chunk_id for rel, _ in files if rel in old_files
+                           for chunk_id in old_files[rel]["ids"]}
+    shared = fix_sources(db, old_files, touched)
+
+    # Manifest is only written once the chunks are in the index - if this is
+    # interrupted the files still count as changed, and the embedding store
+    # makes the next run skip what was already embedded
+    embeddings.report()
+    manifest["files"] = old_files
+    save_manifest(manifest)
+    print(f"✨ Index updated: {total} chunks ({unique} unique, {shared} shared between files)"
+          f" in {time.time() - start:.1f}s")
+
+def build_rag_index(workers=PARSE_WORKERS):
     print("=" * 50)
     print(" RAG Knowledge Base Builder")
     print("=" * 50)
@@ -24,28 +387,22 @@ def build_rag_index():
         print("Please create the folder and add .txt files.")
         return
 
-    # 1. Load documents
+    # 1. Find documents (lazily - nothing is read yet)
     print(f"Loading documents from {KB_PATH}...")
-    try:
-        # Load all .txt files in the directory
-        loader = DirectoryLoader(KB_PATH, glob="**/*.txt", loader_cls=TextLoader, silent_errors=True)
-        documents = loader.load()
-    except Exception as e:
-        print(f"❌ ERROR: Could not load documents: {e}")
-        return
-
-    if not documents:
+    if next(iter_kb_files(), None) is None:
         print("✅ No documents found. Index will not be created.")
         return
 
-    # 2. Split documents into small chunks
-    print(f"Found {len(documents)} documents. Splitting into chunks...")
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    texts = text_splitter.split_documents(documents)
-    print(f"Total {len(texts)} chunks created for embedding.")
+    # 2. Documents are read and split into small chunks as the index asks
+    # for them, remembering which file each chunk came from
+    files = {}
+    failed = set()
+    chunks = iter_chunks(iter_kb_files(), files, workers=workers, failed=failed)
+    print(f"Splitting with {workers} worker process(es)")
 
-    # 3. Define the Ollama Embedding Model
-    embeddings = OllamaEmbeddings(model=OLLAMA_EMBEDDING_MODEL, base_url=OLLAMA_API_URL)
+    # 3. Define the Ollama Embedding Model (batched, parallel, resumable)
+    embeddings = BatchEmbeddings(model=OLLAMA_EMBEDDING_MODEL, host=OLLAMA_HOST,
+                                 batch_size=EMBED_BATCH_SIZE, workers=EMBED_WORKERS)
 
     # 4. Create new Vector Store (THIS IS THE RESOURCE-INTENSIVE STEP)
     print("🧠 Starting embedding calculation (This may take several minutes)...")
@@ -54,16 +411,33 @@ def build_rag_index():
         print(f"⚠️ Deleting existing directory: {RAG_PERSIST_DIR}")
         shutil.rmtree(RAG_PERSIST_DIR)
 
-    db = Chroma.from_documents(
-        texts, 
-        embeddings, 
+    db = Chroma(
         collection_name=RAG_COLLECTION_NAME, 
+        embedding_function=embeddings, 
         persist_directory=RAG_PERSIST_DIR
     )
+    total, unique = index_chunks(db, chunks)
+    drop_failed(db, failed, files)
+    shared = fix_sources(db, files)
+    if failed:
+        # chunks kept because another file has them may still name the failed one
+        fix_sources(db, files, failed)
+    save_manifest({"files": files})
+    embeddings.report()
     
-    print("✨ Indexing complete.")
+    print(f"✨ Indexing complete: {total} chunks from {len(files)} documents"
+          f" ({unique} unique, {shared} shared between files).")
     print(f"Vectors saved to disk at {RAG_PERSIST_DIR}")
     print("You can now run your main JARVIS script, and it will load this index instantly.")
 
 if __name__ == "__main__":
-    build_rag_index()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build or update the JARVIS RAG index")
+    parser.add_argument("--rebuild", action="store_true", help="delete the index and build it from scratch")
+    parser.add_argument("--workers", type=int, default=PARSE_WORKERS,
+                        help=f"processes that split documents (default {PARSE_WORKERS})")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        build_rag_index(max(1, args.workers))
+    else:
+        update_rag_index(max(1, args.workers))
\ No newline at end of file
@@ -0,0 +1,118 @@
+# rag_retriever.py - Runtime lookup in the index built by rag_builder.py
+#
+# Opens the persisted Chroma collection once at startup. For each question
+# the transcript is embedded with the same model the index was built with,
+# the TOP_K nearest chunks are fetched, and they are handed to the prompt
+# as context. Retrieval gets RETRIEVAL_BUDGET seconds: if it is slower
+# (embed model still loading, huge index) the question is answered without
+# context rather than keeping the user waiting.
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from llm_client import EMBED_MODEL, get_client, error_message
+
+try:
+    import chromadb
+    CHROMA_AVAILABLE = True
+except ImportError:
+    CHROMA_AVAILABLE = False
+
+# -------- CONFIG ----------
+# Must match rag_builder.py
+RAG_COLLECTION_NAME = "jarvis_kb_collection"
+RAG_PERSIST_DIR = "./chroma_db"
+
+TOP_K = 3
+RETRIEVAL_BUDGET = 0.5       # seconds for embed + search together
+MAX_DISTANCE = 1.0           # squared L2; nomic vectors are unit length -> cos > 0.5
+MAX_CONTEXT_CHARS = 1500     # keeps the prompt (and prompt eval time) bounded
+# ---------------------------
+
+
+class Retriever:
+    """Top-k chunk lookup in the persisted RAG collection"""
+
+    def __init__(self, persist_dir=RAG_PERSIST_DIR, collection=RAG_COLLECTION_NAME,
+                 top_k=TOP_K, budget=RETRIEVAL_BUDGET, client=None):
+        self.top_k = top_k
+        self.budget = budget
+        self.client = client or get_client()
+        self._db = chromadb.PersistentClient(path=persist_dir)
+        self.collection = self._db.get_collection(collection)
+        self._pool = ThreadPoolExecutor(max_workers=2)  # a slow lookup never blocks the next one
+        print(f"✓ RAG index: {self.collection.count()} chunks from {persist_dir}")
+        # Load the embed model now, not on the first question
+        threading.Thread(target=self._warm_up, daemon=True).start()
+
+    def _warm_up(self):
+        try:
+            self.client.embed("warm up", model=EMBED_MODEL, timeout=60)
+        except Exception:
+            pass
+
+    def _lookup(self, question):
+        timings = {}
+        start = time.time()
+        vector = self.client.embed(question, model=EMBED_MODEL, timeout=self.budget)[0]
+        timings["embed"] = time.time() - start
+
+        start = time.time()
+        result = self.collection.query(query_embeddings=[vector], n_results=self.top_k,
+                                       include=["documents", "distances"])
+        timings["search"] = time.time() - start
+
+        docs = result.get("documents", [[]])[0]
+        distances = result.get("distances", [[]])[0]
+        chunks = [d for d, dist in zip(docs, distances) if dist <= MAX_DISTANCE]
+        return chunks, timings
+
+    def retrieve(self, question):
+        """(chunks, {stage: seconds}) - no chunks if over budget or failing"""
+        start = time.time()
+        future = self._pool.submit(self._lookup, question)
+        try:
+            chunks, timings = future.result(timeout=self.budget)
+        except FutureTimeout:
+            print(f"  [RAG] over budget ({self.budget * 1000:.0f} ms), answering without context")
+            return [], {"retrieve": time.time() - start}
+        except Exception as e:
+            print(f"  [RAG] lookup failed: {error_message(e)}")
+            return [], {"retrieve": time.time() - start}
+        return chunks, timings
+
+    def context(self, question):
+        """(context text for the prompt, timings)"""
+        chunks, timings = self.retrieve(question)
+        kept, size = [], 0
+        for chunk in chunks:
+            size += len(chunk)
+            if kept and size > MAX_CONTEXT_CHARS:
+                break
+            kept.append(chunk.strip())
+        return "\n---\n".join(kept), timings
+
+
+# Opened once per process
+_retriever = None
+_retriever_lock = threading.Lock()
+_retriever_failed = False
+
+def get_retriever():
+    """The shared Retriever, or None if there is no index (or no chromadb)"""
+    global _retriever, _retriever_failed
+    with _retriever_lock:
+        if _retriever is None and not _retriever_failed:
+            if not CHROMA_AVAILABLE:
+                print("(chromadb not installed - answering without the knowledge base)")
+                _retriever_failed = True
+            elif not os.path.isdir(RAG_PERSIST_DIR):
+                print(f"(no RAG index at {RAG_PERSIST_DIR} - run rag_builder.py to create it)")
+                _retriever_failed = True
+            else:
+                try:
+                    _retriever = Retriever()
+                except Exception as e:
+                    print(f"(could not open RAG index: {e})")
+                    _retriever_failed = True
+        return _retriever
@@ -0,0 +1,303 @@
+# response_cache.py - Answer repeated questions without running the LLM
+#
+# The same handful of questions keeps coming back, and each one used to be
+# a full mistral:7b generation. Finished replies are stored under the
+# normalized transcript ("What's the capital of France?" and "whats the
+# capital of france" are one entry), scoped by a fingerprint of the model
+# and the instructions that produced them. Only standalone questions are
+# cached - in a conversation, a question that points back at earlier turns
+# ("what about its population?") skips the cache, and so do RAG-grounded
+# answers.
+# On an exact miss, an optional lookup by nomic-embed-text similarity
+# catches rephrasings. Entries expire after TTL_SECONDS, the least recently
+# used ones are evicted past MAX_ENTRIES, and the cache is kept on disk
+# between runs (written a few seconds after a change and at exit).
+import os
+import re
+import json
+import time
+import atexit
+import hashlib
+import threading
+import collections
+import numpy as np
+from llm_client import SentenceSplitter, EMBED_MODEL, get_client, error_message
+
+# -------- CONFIG ----------
+CACHE_ENABLED = True
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".jarvis_response_cache.json")
+MAX_ENTRIES = 256
+TTL_SECONDS = 7 * 24 * 3600     # answers older than a week are asked again
+MIN_WORDS = 3                   # "yes", "why not" depend on the conversation
+# Similarity lookup when there is no exact match. Off by default: it costs
+# an embedding round-trip on every miss, right before the LLM call
+USE_EMBEDDINGS = False
+SIMILARITY_THRESHOLD = 0.92     # cosine similarity needed to reuse an answer
+EMBED_TIMEOUT = 5
+SAVE_DELAY = 5.0                # seconds; changes within this window are written once
+# Questions whose answer changes by the minute are never cached
+VOLATILE_WORDS = {"time", "today", "tonight", "tomorrow", "yesterday", "now",
+                  "date", "weather", "latest", "news"}
+FILLER_WORDS = {"jarvis", "hey", "please", "um", "uh", "so"}
+# A question with one of these refers to an earlier turn - its answer
+# depends on the conversation, not just on the words
+FOLLOW_UP_WORDS = {"it", "its", "that", "this", "these", "those", "they", "them", "their",
+                   "he", "him", "his", "she", "her", "there", "then", "one", "ones",
+                   "more", "else", "again", "instead", "also", "too", "same", "previous"}
+FOLLOW_UP_STARTS = ("and ", "but ", "or ", "what about ", "how about ", "why not ")
+# ---------------------------
+
+
+def normalize(text):
+    """Cache key for a transcript: lowercase, no punctuation or filler words"""
+    text = text.lower().replace("'", "")
+    words = re.sub(r"[^a-z0-9 ]+", " ", text).split()
+    return " ".join(w for w in words if w not in FILLER_WORDS)
+
+
+def standalone(question):
+    """True if a question can be answered without the turns before it"""
+    normalized = normalize(question)
+    if normalized.startswith(FOLLOW_UP_STARTS):
+        return False
+    return not FOLLOW_UP_WORDS.intersection(normalized.split())
+
+
+def fingerprint(model, instructions):
+    """Cache scope for answers from one model with one system prompt /
+    prompt template - entry points with different instructions never share"""
+    return hashlib.sha1(f"{model}\n{instructions}".encode("utf-8")).hexdigest()[:12]
+
+
+def scoped_prompt(model, template, question):
+    """Fill the {question} slot of a prompt template.
+
+    Returns (prompt, cache scope). The scope is the fingerprint of the
+    unfilled template, so it is the same for every question asked through
+    it and never depends on what the user said.
+    """
+    return template.format(question=question or ""), fingerprint(model, template)
+
+
+class CachedReply:
+    """Stands in for a ReplyStream when the answer comes from the cache"""
+
+    cached = True
+
+    def __init__(self, text, action=""):
+        self.text = text
+        self.action = action
+        self.stats = {}
+        self.error = None
+
+    def __iter__(self):
+        splitter = SentenceSplitter()
+        yield from splitter.feed(self.text + " ")
+        rest = splitter.flush()
+        if rest:
+            yield rest
+
+
+class ResponseCache:
+    """LRU + TTL cache of finished replies, keyed on normalized questions"""
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS,
+                 use_embeddings=USE_EMBEDDINGS, client=None, enabled=CACHE_ENABLED):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.use_embeddings = use_embeddings
+        self.client = client
+        self.enabled = enabled
+        self.entries = collections.OrderedDict()  # key -> {text, action, time, embedding}
+        self.hits = 0
+        self.misses = 0
+        self._matrix = None      # scope -> (keys, unit vectors) for the similarity search
+        self._last_vector = None # (key, vector) of the last looked-up question
+        self._lock = threading.Lock()
+        self._save_timer = None
+        if enabled:
+            self._load()
+            atexit.register(self.flush)
+
+    def cacheable(self, normalized):
+        words = normalized.split()
+        return len(words) >= MIN_WORDS and not VOLATILE_WORDS.intersection(words)
+
+    fingerprint = staticmethod(fingerprint)
+    standalone = staticmethod(standalone)
+
+    def key(self, question, scope=""):
+        return f"{scope}|{normalize(question)}"
+
+    def get(self, question, scope=""):
+        """CachedReply for a question asked before in this scope, or None"""
+        key = self.key(question, scope)
+        if not self.enabled or not self.cacheable(normalize(question)):
+            return None
+
+        start = time.time()
+        with self._lock:
+            self._expire()
+            match = key if key in self.entries else None
+        if match is None and self.use_embeddings:
+            match = self._similar(key, scope)
+
+        with self._lock:
+            entry = self.entries.get(match) if match else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(match)
+            self.hits += 1
+
+        how = "exact" if match == key else f'similar to "{match.split("|", 1)[1]}"'
+        print(f"  [Cache] hit ({how}) in {(time.time() - start) * 1000:.0f} ms")
+        return CachedReply(entry["text"], entry.get("action", ""))
+
+    def put(self, question, text, action="", scope=""):
+        key = self.key(question, scope)
+        if not self.enabled or not self.cacheable(normalize(question)) or not text:
+            return
+        vector = None
+        if self.use_embeddings:
+            vector = self._embedding(key)
+
+        with self._lock:
+            self.entries[key] = {
+                "text": text,
+                "action": action,
+                "time": time.time(),
+                "scope": scope,
+                "embedding": vector,
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._matrix = None
+        self._schedule_save()
+
+    def put_reply(self, question, reply, scope=""):
+        """Store a finished ReplyStream - not errors, not answers cut off by
+        the token budget and not replies that came from the cache anyway"""
+        if getattr(reply, "cached", False) or reply.error is not None:
+            return
+        if reply.stats.get("done_reason") == "length":
+            return
+        self.put(question, reply.text, reply.action, scope)
+
+    def remember(self, question, scope=""):
+        """on_complete callback for a ReplyStream answering `question`"""
+        return lambda reply: self.put_reply(question, reply, scope)
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        stale = [k for k, e in self.entries.items() if e["time"] < cutoff]
+        for key in stale:
+            del self.entries[key]
+        if stale:
+            self._matrix = None
+
+    # --- similarity lookup ---
+    def _embedding(self, key):
+        """Unit vector for a cache key's question, or None if embedding fails"""
+        if self._last_vector is not None and self._last_vector[0] == key:
+            return self._last_vector[1]
+        question = key.split("|", 1)[1]  # the scope is not part of the meaning
+        try:
+            client = self.client or get_client()
+            vector = np.asarray(client.embed(question, model=EMBED_MODEL, timeout=EMBED_TIMEOUT)[0],
+                                dtype=np.float32)
+        except Exception as e:
+            # Model not pulled / Ollama down - stick to exact matches
+            print(f"(response cache: similarity lookup off - {error_message(e)})")
+            self.use_embeddings = False
+            return None
+        vector /= np.linalg.norm(vector) or 1.0
+        vector = [round(float(x), 5) for x in vector]
+        self._last_vector = (key, vector)
+        return vector
+
+    def _similar(self, key, scope=""):
+        """Key of the most similar cached question in the scope above the threshold"""
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = {}
+            if scope not in self._matrix:
+                keys = [k for k, e in self.entries.items()
+                        if e.get("embedding") and e.get("scope", "") == scope]
+                vectors = np.array([self.entries[k]["embedding"] for k in keys], dtype=np.float32)
+                self._matrix[scope] = (keys, vectors)
+            keys, vectors = self._matrix[scope]
+        if not keys:
+            return None
+
+        vector = self._embedding(key)
+        if vector is None:
+            return None
+        scores = vectors @ np.asarray(vector, dtype=np.float32)
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= SIMILARITY_THRESHOLD else None
+
+    # --- persistence ---
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return
+        # Entries from before scoping (no "|" in the key) can't be trusted
+        entries = sorted(((k, e) for k, e in data.get("entries", {}).items() if "|" in k),
+                         key=lambda kv: kv[1].get("time", 0))
+        self.entries = collections.OrderedDict(entries[-self.max_entries:])
+        self._expire()
+        if self.entries:
+            print(f"✓ Response cache: {len(self.entries)} answers loaded")
+
+    def _schedule_save(self):
+        """Write SAVE_DELAY seconds from now - one write for a burst of replies"""
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(SAVE_DELAY, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Write pending changes now (also runs at exit)"""
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is None:
+            return
+        timer.cancel()
+        self.save()
+
+    def save(self):
+        """Write the cache atomically (a crash never leaves half a file)"""
+        with self._lock:
+            data = {"entries": dict(self.entries)}
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"(could not save response cache: {e})")
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self._matrix = None
+        self.save()
+
+
+# Process-wide cache, loaded on first use
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -0,0 +1,72 @@
+import json
+import socket
+import struct
+import threading
+
+import pytest
+import requests
+
+from llm_client import OllamaClient
+
+
+class FakeOllama:
+    """HTTP server on localhost that handles each connection with the next
+    of the given behaviours: "reset", "hang" or "ok"."""
+
+    def __init__(self, *behaviours):
+        self.behaviours = list(behaviours)
+        self.requests = 0
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(8)
+        self.host = "http://127.0.0.1:%d" % self.sock.getsockname()[1]
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        hung = []
+        for behaviour in self.behaviours:
+            conn, _ = self.sock.accept()
+            conn.recv(65536)
+            self.requests += 1
+            if behaviour == "reset":
+                # RST instead of FIN, like a socket the server dropped
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+                conn.close()
+            elif behaviour == "hang":
+                hung.append(conn)
+            else:
+                body = json.dumps({"response": "pong", "done": True}).encode()
+                conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: %d\r\nConnection: close\r\n\r\n" % len(body) + body)
+                conn.close()
+
+    def close(self):
+        self.sock.close()
+
+
+def make_client(server, **kwargs):
+    return OllamaClient(host=server.host, backoff=0, **kwargs)
+
+
+def test_reset_connection_is_retried():
+    server = FakeOllama("reset", "reset", "ok")
+    client = make_client(server)
+    try:
+        assert client.generate("ping") == "pong"
+        assert server.requests == 3
+    finally:
+        client.session.close()
+        server.close()
+
+
+def test_read_timeout_is_not_retried():
+    server = FakeOllama("hang", "ok")
+    client = make_client(server, read_timeout=0.3)
+    try:
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            client.generate("ping")
+        assert server.requests == 1
+    finally:
+        client.session.close()
+        server.close()
@@ -0,0 +1,77 @@
+from llm_client import ChatSession
+from response_cache import ResponseCache, scoped_prompt, standalone
+
+
+class FakeClient:
+    """Streams a canned reply and counts the requests"""
+
+    model = "test-model"
+
+    def __init__(self, reply="Paris is the capital of France."):
+        self.reply = reply
+        self.calls = 0
+
+    def stream(self, prompt=None, messages=None, **kwargs):
+        self.calls += 1
+        for word in self.reply.split(" "):
+            yield word + " ", None
+        yield "", {"done": True, "done_reason": "stop"}
+
+
+def ask(session, question):
+    reply = session.stream(question)
+    text = " ".join(reply)
+    return reply, text
+
+
+def make_session(tmp_path, client):
+    cache = ResponseCache(path=str(tmp_path / "cache.json"), use_embeddings=False, enabled=True)
+    return ChatSession("You are JARVIS.", client=client, cache=cache), cache
+
+
+def test_repeated_standalone_question_is_served_from_cache(tmp_path):
+    client = FakeClient()
+    session, cache = make_session(tmp_path, client)
+
+    first, text = ask(session, "what is the capital of france")
+    second, cached_text = ask(session, "What is the capital of France?")
+    third, _ = ask(session, "what is the capital of france")
+
+    assert client.calls == 1
+    assert not getattr(first, "cached", False)
+    assert second.cached and third.cached
+    assert cached_text == text
+    assert cache.hits == 2
+    # hits still go into the conversation
+    assert len(session.history) == 6
+
+
+def test_follow_up_skips_cache(tmp_path):
+    client = FakeClient()
+    session, cache = make_session(tmp_path, client)
+
+    ask(session, "what is the capital of france")
+    follow_up, _ = ask(session, "what is its population")
+    ask(session, "what is its population")
+
+    assert client.calls == 3
+    assert not getattr(follow_up, "cached", False)
+    assert not any("population" in key for key in cache.entries)
+
+
+def test_standalone():
+    assert standalone("What is the capital of France?")
+    assert not standalone("what about Germany")
+    assert not standalone("and how tall is it")
+    assert not standalone("tell me more")
+
+
+def test_scoped_prompt_scope_ignores_question():
+    template = "The user said: \"{question}\". Answer concisely."
+    prompt, scope = scoped_prompt("mistral:7b", template, "answer")
+    _, other_scope = scoped_prompt("mistral:7b", template, "what is the capital of france")
+
+    assert prompt == "The user said: \"answer\". Answer concisely."
+    assert scope == other_scope
+    assert scoped_prompt("mistral:7b", template, "")[1] == scope
+    assert scoped_prompt("llama3", template, "answer")[1] != scope
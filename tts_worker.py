@@ -0,0 +1,265 @@
+# tts_worker.py - One speech-output thread that owns the pyttsx3 engine
+#
+# speak() used to call tts.runAndWait() on the caller's thread, so nothing
+# else (listening, streaming the rest of the reply) could happen while the
+# assistant talked - or, in new.py, started a thread per utterance on one
+# shared engine. SpeechWorker is the only thread that ever touches the
+# engine: callers queue text and return at once.
+#
+# Barge-in: with a capture attached, the mic is watched while speaking and
+# the user starting to talk cuts the speech off mid-sentence. The audio
+# heard so far becomes the preroll of the next utterance. If the mic's
+# stream dies, the monitor follows the capture get_capture() reopens.
+#
+# Fixed phrases ("Executing.", "Done.") are played from pre-rendered audio
+# (see phrase_cache.py) instead of being synthesized again.
+import time
+import queue
+import threading
+import pyttsx3
+from vad import EnergyVAD
+from audio_capture import get_capture
+from phrase_cache import PhraseCache, PHRASES
+
+# -------- CONFIG ----------
+SPEECH_RATE = 180
+BARGE_IN = True
+BARGE_IN_CHUNKS = 2          # consecutive speech chunks (256 ms each) to interrupt
+BARGE_IN_MIN_RMS = 1500.0    # louder than our own voice leaking into the mic
+# ---------------------------
+
+
+class SpeechWorker(threading.Thread):
+    """Speaks queued utterances one after another; cancel() stops mid-word.
+
+    on_state, if given, is called with "speaking" / "idle" from the worker
+    thread (GUI callers must marshal it onto their UI thread).
+    """
+
+    def __init__(self, rate=SPEECH_RATE, voice_index=None, volume=None, on_state=None,
+                 barge_in=BARGE_IN, phrases=PHRASES):
+        super().__init__(daemon=True)
+        self.rate = rate
+        self.voice_index = voice_index
+        self.volume = volume
+        self.on_state = on_state
+        self.barge_in = barge_in
+        self.phrases = phrases        # None = always synthesize
+        self.running = True
+        self.engine = None
+        self.phrase_cache = None
+        self.capture = None
+        self.interrupted = False       # last speech was cut off by barge-in
+        self.latencies = []            # barge-in reaction times, seconds
+
+        self._queue = queue.Queue()
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._speaking = threading.Event()
+        self._cancel = threading.Event()
+        self._cancel_at = None         # (onset, cancel time) of a pending barge-in
+        self._vad = EnergyVAD(min_rms=BARGE_IN_MIN_RMS)
+        self._mic_lost = False
+
+    # --- caller side ---
+    def say(self, text):
+        """Queue text and return immediately"""
+        if not text:
+            return
+        with self._idle:
+            if self.interrupted:
+                return  # rest of an interrupted reply
+            self._pending += 1
+        self._queue.put(text)
+
+    def wait(self, timeout=None):
+        """Block until everything queued has been spoken (or cancelled).
+
+        Returns True if speech was cut off by barge-in; that resets the flag.
+        """
+        with self._idle:
+            self._idle.wait_for(lambda: self._pending == 0, timeout)
+            interrupted, self.interrupted = self.interrupted, False
+        return interrupted
+
+    @property
+    def busy(self):
+        return self._pending > 0
+
+    def cancel(self, onset=None, barge_in=False):
+        """Drop everything queued and stop the current utterance"""
+        with self._idle:
+            if barge_in:
+                self.interrupted = True
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._pending -= 1
+            self._idle.notify_all()
+        if self._speaking.is_set():
+            now = time.perf_counter()
+            self._cancel_at = (onset or now, now)
+            self._cancel.set()
+
+    def attach_capture(self, capture):
+        """Watch this AudioCapture for the user talking over us"""
+        if self.capture is capture:
+            return
+        first = self.capture is None
+        self.capture = capture
+        if first and self.barge_in:
+            threading.Thread(target=self._watch, daemon=True).start()
+
+    def _current_capture(self):
+        """The attached capture, re-resolved through get_capture() once its
+        stream has died (device unplugged...) - None while there is no mic"""
+        capture = self.capture
+        if capture is None or capture.running:
+            return capture
+        fresh = get_capture(capture.requested_index)
+        if fresh is None:
+            if not self._mic_lost:
+                print("⚠️ Barge-in paused: microphone lost")
+                self._mic_lost = True
+            return None
+        print("✓ Barge-in: following the reopened microphone")
+        self._mic_lost = False
+        self.capture = fresh
+        return fresh
+
+    def latency_stats(self):
+        """(count, mean ms, max ms) of barge-in reaction times"""
+        if not self.latencies:
+            return 0, 0.0, 0.0
+        ms = [l * 1000 for l in self.latencies]
+        return len(ms), sum(ms) / len(ms), max(ms)
+
+    def stop(self):
+        self.running = False
+        self.cancel()
+        self._queue.put(None)
+
+    # --- worker side ---
+    def run(self):
+        try:
+            self.engine = pyttsx3.init()
+            self.engine.setProperty("rate", self.rate)
+            if self.volume is not None:
+                self.engine.setProperty("volume", self.volume)
+            if self.voice_index is not None:
+                voices = self.engine.getProperty("voices")
+                if voices and self.voice_index < len(voices):
+                    self.engine.setProperty("voice", voices[self.voice_index].id)
+            # Checked between words - the only safe place to stop the engine
+            self.engine.connect("started-word", self._on_word)
+        except Exception as e:
+            print(f"TTS init error: {e}")
+            self.engine = None
+
+        if self.engine is not None and self.phrases:
+            try:
+                self.phrase_cache = PhraseCache(self.engine, self.rate, self.phrases)
+            except Exception as e:
+                print(f"(phrase cache disabled: {e})")
+
+        while self.running:
+            text = self._queue.get()
+            if text is None:
+                continue
+            if not self.interrupted:
+                self._speak(text)
+            with self._idle:
+                self._pending -= 1
+                idle = self._pending == 0
+                self._idle.notify_all()
+            if idle:
+                self._set_state("idle")
+
+        if self.phrase_cache is not None:
+            self.phrase_cache.close()
+
+    def _speak(self, text):
+        print(f"JARVIS: {text}")
+        if self.engine is None:
+            return
+        clip = self.phrase_cache.get(text) if self.phrase_cache is not None else None
+        self._cancel.clear()
+        self._speaking.set()
+        self._set_state("speaking")
+        try:
+            if clip is not None and not self._play(clip):
+                clip = None
+            if clip is None:
+                self.engine.say(text)
+                self.engine.runAndWait()
+        except Exception as e:
+            print(f"(TTS error: {e})")
+        finally:
+            self._speaking.clear()
+
+        if self._cancel.is_set() and self._cancel_at is not None:
+            onset, cancelled = self._cancel_at
+            stopped = time.perf_counter()
+            self._cancel_at = None
+            if self.interrupted:
+                self.latencies.append(stopped - onset)
+                print(f"  [TTS] barge-in: stopped {(stopped - onset) * 1000:.0f} ms after speech onset"
+                      f" (detect {(cancelled - onset) * 1000:.0f} ms + stop {(stopped - cancelled) * 1000:.0f} ms)")
+
+    def _play(self, clip):
+        try:
+            self.phrase_cache.play(clip, cancelled=self._cancel.is_set)
+            return True
+        except Exception as e:
+            print(f"(cached phrase playback failed, synthesizing: {e})")
+            self.phrase_cache.close_stream()
+            return False
+
+    def _on_word(self, name, location, length):
+        if self._cancel.is_set():
+            self.engine.stop()
+
+    def _set_state(self, state):
+        if self.on_state is not None:
+            try:
+                self.on_state(state)
+            except Exception:
+                pass
+
+    def _watch(self):
+        """Barge-in monitor: runs only while something is being spoken"""
+        while self.running:
+            if not self._speaking.wait(timeout=0.5):
+                continue
+            capture = self._current_capture()
+            if capture is None:
+                time.sleep(1.0)
+                continue
+
+            q = capture.subscribe(preroll=False)
+            heard, onset = [], None
+            try:
+                while self._speaking.is_set() and self.running:
+                    try:
+                        data = q.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if data is None:
+                        break
+                    if not self._vad.is_speech(data):
+                        heard, onset = [], None
+                        continue
+                    if onset is None:
+                        # The chunk arrived once it was complete - speech began inside it
+                        onset = time.perf_counter() - capture.chunk / capture.rate
+                    heard.append(data)
+                    if len(heard) >= BARGE_IN_CHUNKS:
+                        capture.reset_preroll(heard)
+                        self.cancel(onset=onset, barge_in=True)
+                        break
+            finally:
+                capture.unsubscribe(q)
+            while self._speaking.is_set() and self.running:
+                time.sleep(0.02)
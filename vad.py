@@ -0,0 +1,109 @@
+# vad.py - Energy-based voice activity detection in front of Vosk
+#
+# Every chunk used to go through rec.AcceptWaveform() and PartialResult()
+# was JSON-decoded just to notice silence. This decides speech vs. silence
+# from the audio itself (RMS + zero-crossing rate against an adaptive noise
+# floor), keeps silent chunks away from the recognizer and ends the
+# utterance after a fixed stretch of silence.
+import numpy as np
+
+# -------- CONFIG ----------
+RATE = 16000
+FRAME_SAMPLES = 512          # 32 ms analysis frames (4096-sample chunk = 8 frames)
+SPEECH_RATIO = 3.0           # frame is speech if RMS > noise floor * this
+MIN_SPEECH_RMS = 200.0       # ...and above this absolute level (int16 scale)
+MAX_SPEECH_ZCR = 0.35        # hiss/fan noise has a high zero-crossing rate
+MIN_SPEECH_FRAMES = 2        # speech frames needed to call a chunk speech
+END_SILENCE_SECONDS = 1.0    # silence after speech that ends the utterance
+HANGOVER_CHUNKS = 1          # trailing silent chunks still fed to Vosk
+# ---------------------------
+
+
+class EnergyVAD:
+    """Per-frame speech/silence decision with an adaptive noise floor.
+
+    The floor follows the quietest frames of each chunk: it drops quickly
+    when the room gets quieter and rises slowly, so speech itself doesn't
+    drag it up.
+    """
+
+    def __init__(self, rate=RATE, frame_samples=FRAME_SAMPLES, noise_floor=100.0,
+                 min_rms=MIN_SPEECH_RMS):
+        self.rate = rate
+        self.frame_samples = frame_samples
+        self.noise_floor = noise_floor
+        self.min_rms = min_rms
+        self.rise = 0.05
+        self.fall = 0.5
+
+    def frame_flags(self, data):
+        """Boolean speech flag for every full frame in a chunk of int16 bytes"""
+        samples = np.frombuffer(data, dtype=np.int16)
+        n_frames = len(samples) // self.frame_samples
+        if n_frames == 0:
+            return np.zeros(0, dtype=bool)
+
+        frames = samples[:n_frames * self.frame_samples].reshape(n_frames, self.frame_samples)
+        frames = frames.astype(np.float32)
+
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_samples - 1)
+
+        threshold = max(self.noise_floor * SPEECH_RATIO, self.min_rms)
+        # Loud frames count even when noisy (fricatives like "s", "f")
+        flags = (rms > threshold) & ((zcr < MAX_SPEECH_ZCR) | (rms > threshold * 2))
+
+        self._update_floor(rms, flags.any())
+        return flags
+
+    def _update_floor(self, rms, had_speech):
+        quiet = float(np.percentile(rms, 10))
+        if quiet < self.noise_floor:
+            rate = self.fall
+        else:
+            # Creep up much slower while someone is talking
+            rate = self.rise * 0.2 if had_speech else self.rise
+        self.noise_floor += (quiet - self.noise_floor) * rate
+        self.noise_floor = max(self.noise_floor, 1.0)
+
+    def is_speech(self, data):
+        return int(np.count_nonzero(self.frame_flags(data))) >= MIN_SPEECH_FRAMES
+
+
+class Endpointer:
+    """Decides which chunks reach the recognizer and when the utterance ends.
+
+    Before speech, only the last silent chunk is held back (and fed together
+    with the first speech chunk so the onset isn't clipped). After speech,
+    HANGOVER_CHUNKS of silence are still fed so the last word finalizes, and
+    END_SILENCE_SECONDS of silence ends the utterance.
+    """
+
+    def __init__(self, vad, chunk_seconds, end_silence=END_SILENCE_SECONDS,
+                 hangover=HANGOVER_CHUNKS):
+        self.vad = vad
+        self.chunk_seconds = chunk_seconds
+        self.end_silence = end_silence
+        self.hangover = hangover
+        self.got_speech = False
+        self.silent_chunks = 0
+        self._held = None
+
+    def process(self, data):
+        """Return (chunks to pass to the recognizer, utterance finished)"""
+        if self.vad.is_speech(data):
+            feed = [self._held, data] if self._held is not None else [data]
+            self._held = None
+            self.got_speech = True
+            self.silent_chunks = 0
+            return feed, False
+
+        if not self.got_speech:
+            self._held = data
+            return [], False
+
+        self.silent_chunks += 1
+        feed = [data] if self.silent_chunks <= self.hangover else []
+        done = self.silent_chunks * self.chunk_seconds >= self.end_silence
+        return feed, done
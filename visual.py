@@ -6,19 +6,22 @@ import json
 import subprocess
 import time
 import math
-import random
 import threading
 import tkinter as tk
+import numpy as np
 from PIL import Image, ImageTk, ImageDraw
 
 # Core dependencies (Imported here to make the script self-contained)
-import pyttsx3
-import pyaudio
-import requests 
+from audio_capture import get_capture
+from llm_client import ReplyStream, get_client
+from response_cache import get_cache, scoped_prompt
+from tts_worker import SpeechWorker
+from frame_pacer import FramePacer
 
 # Vosk is optional but required for listening functionality
 try:
     from vosk import Model, KaldiRecognizer
+    from wake_word import WakeWordSpotter
     VOSK_AVAILABLE = True
 except ImportError:
     VOSK_AVAILABLE = False
@@ -33,7 +36,7 @@ SCALE_FACTOR = 2
 
 # Tkinter/HUD Settings
 WIDTH, HEIGHT = 300 * SCALE_FACTOR, 300 * SCALE_FACTOR # 600x600 window
-FPS = 1000 
+ANIM_FPS = 60    # animation steps are tuned per frame at this rate; the real rate follows hud_state
 BG_COLOR_TK = 'black' 
 
 # Particle Configuration
@@ -42,6 +45,7 @@ PARTICLE_INIT_RADIUS_MIN = 5 * SCALE_FACTOR
 PARTICLE_INIT_RADIUS_MAX = 75 * SCALE_FACTOR 
 PARTICLE_GROWTH_RATE = 1.6 
 PARTICLE_POINT_SIZE = 2 
+PARTICLE_SPAWN = 5        # new particles per frame (at ANIM_FPS) - raise along with MAX_PARTICLES
 
 # Core and Ring Configuration
 PULSE_RING_BASE_RADIUS = 65 * SCALE_FACTOR 
@@ -58,14 +62,21 @@ COLORS_HEX = {
 # --- DUAL COLOR ---
 SECONDARY_COLOR_HEX = "#FF00C8" # Deep Magenta (for Particles)
 
+def hex_to_rgb(color):
+    return tuple(int(color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
+
+# Parsed once, not per frame
+COLORS_RGB = {state: hex_to_rgb(color) for state, color in COLORS_HEX.items()}
+SECONDARY_COLOR_RGB = hex_to_rgb(SECONDARY_COLOR_HEX)
+
 # Backend Config (Minimal, just to let the script run)
 VOSK_MODEL_DIR = "D:/Jarvis/models/vosk/vosk-model-small-en-us-0.15" 
 OLLAMA_MODEL = "mistral:7b"
-OLLAMA_API_URL = "http://localhost:11434/api/generate"
 OLLAMA_MAX_TOKENS = 100
 CHUNK = 4096
 RATE = 16000
 LISTEN_DURATION_SEC = 4
+HANDS_FREE = "--wake" in sys.argv  # say "Jarvis" instead of pressing Enter
 WHITELISTED_ACTIONS = {
     "open_notepad": {"cmd": ["notepad"]},
     "open_browser": {"cmd": ["start", "msedge"]},
@@ -73,26 +84,144 @@ WHITELISTED_ACTIONS = {
 
 # --- Global State ---
 hud_state = {"state": "idle", "intensity": 0.5}
+hud_pacer = FramePacer("HUD")
 
 # -----------------------------------------------------------------------------
 # --- 2. PARTICLE SYSTEM & PILLOW RENDERING (GUI) ---
 # -----------------------------------------------------------------------------
 
-class Particle:
-    __slots__ = ('x', 'y', 'radius', 'angle', 'speed')
-
-    def __init__(self, cx, cy):
-        self.radius = random.uniform(PARTICLE_INIT_RADIUS_MIN, PARTICLE_INIT_RADIUS_MAX)
-        self.angle = random.uniform(0, 2 * math.pi)
-        self.x = cx + math.cos(self.angle) * self.radius
-        self.y = cy + math.sin(self.angle) * self.radius
-        self.speed = random.uniform(0.005, 0.01)
+class ParticlePool:
+    """Fixed-capacity particle system as arrays (struct of arrays).
+
+    Particles are spawned into free slots and retired by clearing their
+    alive flag. The arrays are never reallocated and no Python objects are
+    made per frame; a frame is a few array ops (and their temporaries).
+    Slots get reused out of order, so each particle keeps a spawn number
+    and live_order() gives the slots oldest first - the drawing order.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.radius = np.zeros(capacity)
+        self.angle = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.born = np.zeros(capacity, dtype=np.int64)
+        self._spawned = 0
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive))
+
+    def spawn(self, count, cx, cy):
+        """Start up to `count` particles in free slots"""
+        slots = np.flatnonzero(~self.alive)[:count]
+        n = len(slots)
+        if not n:
+            return
+        self.radius[slots] = np.random.uniform(PARTICLE_INIT_RADIUS_MIN, PARTICLE_INIT_RADIUS_MAX, n)
+        self.angle[slots] = np.random.uniform(0, 2 * math.pi, n)
+        self.speed[slots] = np.random.uniform(0.005, 0.01, n)
+        self.x[slots] = cx + np.cos(self.angle[slots]) * self.radius[slots]
+        self.y[slots] = cy + np.sin(self.angle[slots]) * self.radius[slots]
+        self.alive[slots] = True
+        self.born[slots] = self._spawned + np.arange(n)
+        self._spawned += n
+
+    def live_order(self):
+        """Indices of the live particles, oldest first"""
+        live = np.flatnonzero(self.alive)
+        return live[np.argsort(self.born[live], kind="stable")]
+
+    def retire(self, max_radius):
+        """Free the slots of particles that drifted out to max_radius"""
+        self.alive &= self.radius < max_radius
 
     def update(self, dt, cx, cy, intensity):
-        self.angle += self.speed * 30 * intensity
-        self.radius += PARTICLE_GROWTH_RATE * intensity
-        self.x = cx + math.cos(self.angle) * self.radius
-        self.y = cy + math.sin(self.angle) * self.radius
+        a = self.alive
+        self.angle[a] += self.speed[a] * 30 * intensity * dt
+        self.radius[a] += PARTICLE_GROWTH_RATE * intensity * dt
+        self.x[a] = cx + np.cos(self.angle[a]) * self.radius[a]
+        self.y[a] = cy + np.sin(self.angle[a]) * self.radius[a]
+
+class HudSprites:
+    """Pre-rendered pieces of the Pillow HUD and the one buffer a frame is
+    composited in. Particles are scattered into the buffer with NumPy
+    indexing; the core glow is one cached sprite per color and size."""
+
+    def __init__(self, width, height):
+        self.buffer = np.zeros((height, width, 4), dtype=np.uint8)
+
+        # Pixels of one particle dot, as (dy, dx) from its top-left corner
+        size = 2 * PARTICLE_POINT_SIZE
+        dot = Image.new('L', (size + 1, size + 1), 0)
+        ImageDraw.Draw(dot).ellipse((0, 0, size, size), fill=255)
+        self.dot_offsets = np.argwhere(np.asarray(dot) > 0)
+        self.dot_flat = self.dot_offsets[:, 0] * width + self.dot_offsets[:, 1]
+
+        self.cores = {}  # (rgb, size) -> (sprite, mask, half width)
+
+    def clear(self):
+        self.buffer.fill(0)
+
+    def scatter_dots(self, x, y, alpha, rgb):
+        """Draw dots at (x, y) with per-dot alpha - a few array ops in total,
+        however many particles there are. Where dots overlap the later one
+        wins, as if they were drawn one by one."""
+        if len(x) == 0:
+            return
+        h, w = self.buffer.shape[:2]
+        size = 2 * PARTICLE_POINT_SIZE
+        x0 = (x - PARTICLE_POINT_SIZE).astype(np.int64)
+        y0 = (y - PARTICLE_POINT_SIZE).astype(np.int64)
+        # one RGBA pixel = one uint32
+        color = np.empty((len(x), 4), dtype=np.uint8)
+        color[:, :3] = rgb
+        color[:, 3] = alpha
+        color = color.view(np.uint32).ravel()
+        pixels = self.buffer.view(np.uint32).reshape(-1)
+
+        # all dots entirely on screen: every pixel of every dot at once
+        if (x0 >= 0).all() and (x0 + size < w).all() and (y0 >= 0).all() and (y0 + size < h).all():
+            pixels[(y0 * w + x0)[:, None] + self.dot_flat] = color[:, None]
+            return
+
+        # some cut by the edge: check each pixel (still one pass, in dot order)
+        px = x0[:, None] + self.dot_offsets[:, 1]
+        py = y0[:, None] + self.dot_offsets[:, 0]
+        inside = (px >= 0) & (px < w) & (py >= 0) & (py < h)
+        owner = np.broadcast_to(color[:, None], px.shape)
+        pixels[(py * w + px)[inside]] = owner[inside]
+
+    def core(self, rgb, core_size):
+        """3-layer core glow sprite for a color and core size (to half a pixel)"""
+        core_size = round(core_size * 2) / 2
+        key = (rgb, core_size)
+        if key not in self.cores:
+            self.cores[key] = self._render_core(rgb, core_size)
+        return self.cores[key]
+
+    def _render_core(self, rgb, core_size):
+        r, g, b = rgb
+        half = int(math.ceil(core_size + (15 * SCALE_FACTOR))) + 1
+        sprite = Image.new('RGBA', (2 * half + 1, 2 * half + 1), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(sprite)
+
+        def disc(radius, fill):
+            draw.ellipse([half - radius, half - radius, half + radius, half + radius], fill=fill)
+
+        # --- Layer 1: Outer Soft Aura (Primary Color, High Transparency) ---
+        disc(core_size + (15 * SCALE_FACTOR), (r, g, b, 50))
+        # --- Layer 2: Inner Glow (Primary Color, Moderate Transparency) ---
+        disc(core_size + (5 * SCALE_FACTOR), (r, g, b, 150))
+        # --- Layer 3: Opaque White Center (Visible on ANY background) ---
+        disc(core_size / 2, (255, 255, 255, 255))
+
+        # The layers replace what's under them (like drawing them in place did)
+        mask = sprite.getchannel('A').point(lambda a: 255 if a else 0)
+        return sprite, mask, half
+
 
 class JarvisGUI:
     def __init__(self, root):
@@ -115,10 +244,16 @@ class JarvisGUI:
         self.status_label.place(x=WIDTH//2, y=HEIGHT - (30 * SCALE_FACTOR // 2), anchor="center")
         
         self.center_x, self.center_y = WIDTH // 2, HEIGHT // 2
-        self.particles = []
         self.max_particles = MAX_PARTICLES
-        self._photo = None 
+        self.particles = ParticlePool(MAX_PARTICLES)
+        self._spawn_carry = 0.0
+        self.sprites = HudSprites(WIDTH, HEIGHT)
+        self._status = None
+        # One PhotoImage and one canvas item, updated in place every frame
+        self._photo = ImageTk.PhotoImage('RGBA', (WIDTH, HEIGHT))
+        self.canvas.create_image(self.center_x, self.center_y, image=self._photo, tags="HUDIMG")
         self.angle = 0
+        self._last_frame = time.perf_counter()
         
         # --- DRAGGABILITY FIX: Bind drag events to the root window ---
         self.drag_data = {"x": 0, "y": 0}
@@ -135,45 +270,41 @@ class JarvisGUI:
         y = event.y_root - self.drag_data["y"]
         self.root.geometry(f"+{x}+{y}")
         
-    def update_particles(self, intensity):
-        """Updates and prunes particles."""
-        self.particles = [p for p in self.particles if p.radius < self.center_x]
+    def update_particles(self, intensity, step=1):
+        """Updates and prunes particles (step = elapsed time in ANIM_FPS frames)."""
+        self.particles.retire(self.center_x)
         
         current_max = int(self.max_particles * intensity)
-        if len(self.particles) < current_max:
-            for _ in range(5):
-                if len(self.particles) < current_max:
-                    self.particles.append(Particle(self.center_x, self.center_y))
+        # PARTICLE_SPAWN per ANIM_FPS frame, whatever the real frame rate
+        self._spawn_carry += PARTICLE_SPAWN * step
+        burst = int(self._spawn_carry)
+        self._spawn_carry -= burst
+        room = current_max - len(self.particles)
+        if room > 0:
+            self.particles.spawn(min(burst, room), self.center_x, self.center_y)
         
-        for p in self.particles:
-            p.update(1, self.center_x, self.center_y, intensity) 
+        self.particles.update(step, self.center_x, self.center_y, intensity)
 
     def draw_hud_with_pillow(self, state, intensity):
-        """Renders the HUD using Pillow for anti-aliasing and dual colors."""
-        
-        img = Image.new('RGBA', (WIDTH, HEIGHT), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
+        """Renders the HUD with Pillow: cached sprites composited into a reused buffer."""
         
         # --- 1. Primary State Color (for Rings/Core Glow) ---
         current_color_hex = COLORS_HEX.get(state, COLORS_HEX["idle"])
-        r, g, b = tuple(int(current_color_hex.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
-        
-        # --- 2. Secondary Particle Color ---
-        r2, g2, b2 = tuple(int(SECONDARY_COLOR_HEX.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
-
-
-        # 3. Draw the particles (using Secondary Color)
-        for p in self.particles:
-            alpha = max(0, 255 - int(p.radius * 255 / self.center_x))
-            color_rgba = (r2, g2, b2, alpha) 
-            
-            p_size = PARTICLE_POINT_SIZE 
-            box = (int(p.x - p_size), int(p.y - p_size), 
-                   int(p.x + p_size), int(p.y + p_size))
-            
-            draw.ellipse(box, fill=color_rgba)
+        r, g, b = COLORS_RGB.get(state, COLORS_RGB["idle"])
+
+        # 2. Scatter the particles (using Secondary Color) into the cleared buffer
+        self.sprites.clear()
+        # oldest first, so newer particles are drawn on top
+        live = self.particles.live_order()
+        radii = self.particles.radius[live]
+        alpha = np.maximum(0, 255 - (radii * 255 / self.center_x).astype(np.int64))
+        self.sprites.scatter_dots(self.particles.x[live], self.particles.y[live], alpha,
+                                  SECONDARY_COLOR_RGB)
+
+        img = Image.fromarray(self.sprites.buffer, 'RGBA')
+        draw = ImageDraw.Draw(img)
             
-        # 4. Draw a static holographic circle outline (pulsing) (using Primary Color)
+        # 3. Draw a static holographic circle outline (pulsing) (using Primary Color)
         pulse_base = PULSE_RING_BASE_RADIUS + (20 * SCALE_FACTOR * intensity)
         pulse = (math.sin(self.angle * 0.05) * (5 * SCALE_FACTOR)) + pulse_base
         
@@ -185,55 +316,51 @@ class JarvisGUI:
                
         draw.ellipse(box, outline=outline_color, width=2)
         
-        # 5. Draw the central core (ADAPTIVE FIX - 3 LAYER GLOW)
+        # 4. Paste the central core (cached 3-layer glow sprite)
         core_size_base = CORE_RING_BASE_RADIUS + (CORE_PULSE_MAGNITUDE * intensity)
         core_size = (math.sin(self.angle * 0.1) * (CORE_PULSE_MAGNITUDE / 2)) + core_size_base
+        sprite, mask, half = self.sprites.core((r, g, b), core_size)
+        img.paste(sprite, (self.center_x - half, self.center_y - half), mask)
+
+        # Update the PhotoImage in place
+        self._photo.paste(img)
         
-        # --- Layer 1: Outer Soft Aura (Primary Color, High Transparency) ---
-        aura_size = core_size + (15 * SCALE_FACTOR)
-        aura_box = [self.center_x - aura_size, self.center_y - aura_size,
-                    self.center_x + aura_size, self.center_y + aura_size]
-        # Use low alpha for a faint light spill
-        draw.ellipse(aura_box, fill=(r, g, b, 50)) 
-        
-        # --- Layer 2: Inner Glow (Primary Color, Moderate Transparency) ---
-        glow_size = core_size + (5 * SCALE_FACTOR)
-        glow_box = [self.center_x - glow_size, self.center_y - glow_size,
-                    self.center_x + glow_size, self.center_y + glow_size]
-        # Use moderate alpha for the main glow effect
-        draw.ellipse(glow_box, fill=(r, g, b, 150)) 
-        
-        # --- Layer 3: Opaque White Center (Visible on ANY background) ---
-        white_core_size = core_size / 2
-        white_core_box = [self.center_x - white_core_size, self.center_y - white_core_size,
-                          self.center_x + white_core_size, self.center_y + white_core_size]
-        # This solid white center provides the necessary contrast
-        draw.ellipse(white_core_box, fill=(255, 255, 255, 255)) 
-
-        # Convert Pillow Image to Tkinter PhotoImage and update canvas
-        self._photo = ImageTk.PhotoImage(img)
-        self.canvas.delete("HUDIMG")
-        self.canvas.create_image(self.center_x, self.center_y, image=self._photo, tags="HUDIMG")
-        
-        # Update status label
-        self.status_label.config(text=f" {state.capitalize()}", fg=current_color_hex)
+        # Update status label (only when it changes)
+        if self._status != state:
+            self._status = state
+            self.status_label.config(text=f" {state.capitalize()}", fg=current_color_hex)
         
     def animate(self):
-        """Main animation loop driven by Tkinter."""
-        self.angle += 1
+        """Main animation loop driven by Tkinter, paced by the assistant state."""
         state, intensity = hud_state["state"], hud_state["intensity"]
+        hud_pacer.set_state(state)
+
+        # Motion follows the clock, not the frame count, so it looks the same at any rate
+        hud_pacer.begin_frame()
+        now = time.perf_counter()
+        step = min((now - self._last_frame) * ANIM_FPS, 10)
+        self._last_frame = now
+        self.angle += step
         
-        self.update_particles(intensity)
+        self.update_particles(intensity, step)
         self.draw_hud_with_pillow(state, intensity)
+        hud_pacer.end_frame()
         
-        self.root.after(int(1000 / FPS), self.animate)
+        self.root.after(hud_pacer.delay_ms(), self.animate)
 
 # -----------------------------------------------------------------------------
 # --- 3. BACKEND CORE (STT, TTS, LLM) --- (Unchanged)
 # -----------------------------------------------------------------------------
 
-tts = pyttsx3.init()
-tts.setProperty("rate", 180) 
+def _speech_state(state):
+    if state == "speaking":
+        hud_state["state"], hud_state["intensity"] = "speaking", 0.8
+    else:
+        hud_state["state"], hud_state["intensity"] = "idle", 0.5
+
+# TTS runs on its own thread; the HUD follows it through _speech_state
+speech = SpeechWorker(rate=180, on_state=_speech_state)
+speech.start()
 vosk_model = None
 
 def load_model():
@@ -246,29 +373,20 @@ def load_model():
     return True
 
 def speak(text):
-    print("JARVIS:", text)
-    hud_state["state"], hud_state["intensity"] = "speaking", 0.8
-    tts.say(text)
-    tts.runAndWait()
-    hud_state["state"], hud_state["intensity"] = "idle", 0.5
+    speech.say(text)
 
 def listen_once(device_index=None):
     if vosk_model is None: return ""
-    p = pyaudio.PyAudio()
-    stream = p.open(format=pyaudio.paInt16, channels=1, rate=RATE, input=True,
-                    frames_per_buffer=CHUNK, input_device_index=device_index)
+    capture = get_capture(device_index)
+    if capture is None: return ""
     rec = KaldiRecognizer(vosk_model, RATE)
     
     hud_state["state"], hud_state["intensity"] = "listening", 1.0
     print("Listening...")
 
-    for _ in range(0, int(RATE / CHUNK * LISTEN_DURATION_SEC)):
-        try:
-            data = stream.read(CHUNK, exception_on_overflow=False)
-            if rec.AcceptWaveform(data): break
-        except Exception: break
+    for data in capture.utterance(LISTEN_DURATION_SEC):
+        if rec.AcceptWaveform(data): break
         
-    stream.stop_stream(); stream.close(); p.terminate()
     final = rec.FinalResult()
     try:
         text = json.loads(final).get("text", "")
@@ -276,20 +394,18 @@ def listen_once(device_index=None):
         return text
     except Exception: return ""
 
-def query_ollama(prompt):
+def stream_reply(template, question):
+    """Streamed Ollama reply to `question`, asked through a prompt template
+    with a {question} slot - iterate it to get sentences as they finish.
+    A question answered before comes straight from the response cache."""
+    cache = get_cache()
+    prompt, scope = scoped_prompt(OLLAMA_MODEL, template, question)
+    cached = cache.get(question, scope)
+    if cached is not None:
+        return cached
     hud_state["state"], hud_state["intensity"] = "thinking", 0.7
-    try:
-        response = requests.post(
-            OLLAMA_API_URL,
-            json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": False, 
-                  "options": {"num_predict": OLLAMA_MAX_TOKENS}},
-            timeout=30
-        )
-        data = response.json()
-        return data.get("response", "Local model unavailable.").strip()
-    except Exception as e:
-        print(f"Ollama Error: {e}")
-        return "I am having trouble connecting to the local model."
+    return ReplyStream(prompt, max_tokens=OLLAMA_MAX_TOKENS, model=OLLAMA_MODEL, timeout=30,
+                       on_complete=cache.remember(question, scope))
 
 def handle_action(action_text):
     command = WHITELISTED_ACTIONS.get(action_text.lower().replace(" ", "_"))
@@ -311,17 +427,43 @@ class JarvisController(threading.Thread):
         self.mic_index = mic_index
         self.running = True
         self.daemon = True 
+        self.spotter = None
+
+    def wait_for_wake_word(self):
+        """Low-CPU keyword spotting until 'Jarvis' is heard"""
+        capture = get_capture(self.mic_index)
+        if capture is None:
+            time.sleep(1)
+            return False
+        if self.spotter is None or self.spotter.capture is not capture:
+            self.spotter = WakeWordSpotter(vosk_model, capture)
+        print("\n[Say 'Jarvis' to Speak]...")
+        return self.spotter.wait()
 
     def run(self):
+        hands_free = HANDS_FREE
+        get_client().warm_up_async(OLLAMA_MODEL)  # in parallel with Vosk
         if not load_model():
             speak("Error: Voice model not found. Speech recognition is disabled.")
+            hands_free = False
         else:
-            speak("Jarvis system online. Press Enter in the console to activate.")
-        time.sleep(1) 
+            capture = get_capture(self.mic_index)
+            if capture is not None:
+                speech.attach_capture(capture)  # talking over JARVIS interrupts it
+            if hands_free:
+                speak("Jarvis system online. Say my name to activate.")
+            else:
+                speak("Jarvis system online. Press Enter in the console to activate.")
 
         while self.running:
             try:
-                input("\n[Press Enter to Speak]...")
+                # After a barge-in the user is already talking - listen right away
+                if speech.wait():
+                    print("\n(interrupted - listening)")
+                elif hands_free:
+                    if not self.wait_for_wake_word(): continue
+                else:
+                    input("\n[Press Enter to Speak]...")
                 
                 user_text = listen_once(self.mic_index)
                 if not user_text.strip():
@@ -333,22 +475,21 @@ class JarvisController(threading.Thread):
                 if any(x in lower_text for x in ["exit", "shutdown", "goodbye"]):
                     self.running = False
                     speak("Goodbye. System shutting down.")
+                    speech.wait()
                     break 
 
-                prompt = f"You are a helpful and concise assistant named Jarvis. The user said: \"{user_text}\". Answer concisely. If the user asked to run a whitelisted system action (like open notepad or open browser), output a single line starting with ACTION: followed by the action name exactly as defined in the list. Otherwise just answer normally."
-                response = query_ollama(prompt)
+                template = "You are a helpful and concise assistant named Jarvis. The user said: \"{question}\". Answer concisely. If the user asked to run a whitelisted system action (like open notepad or open browser), output a single line starting with ACTION: followed by the action name exactly as defined in the list. Otherwise just answer normally."
+                reply = stream_reply(template, user_text)
                 
-                if "ACTION:" in response:
-                    parts = response.split("ACTION:", 1)
-                    speech_text = parts[0].strip()
-                    action_text = parts[1].strip()
-                    
-                    if speech_text: speak(speech_text)
-                    
-                    action_result = handle_action(action_text)
-                    if not speech_text: speak(action_result)
-                else:
-                    speak(response)
+                # Speak each sentence as soon as it has been generated
+                for sentence in reply:
+                    if speech.interrupted:
+                        break  # stops the generation too
+                    speak(sentence)
+                
+                if reply.action:
+                    action_result = handle_action(reply.action)
+                    if not reply.text: speak(action_result)
                     
             except KeyboardInterrupt:
                 self.running = False
@@ -377,4 +518,5 @@ if __name__ == "__main__":
     root.mainloop() 
     
     controller.running = False
+    hud_pacer.report()
     print("Application closed.")
\ No newline at end of file
@@ -0,0 +1,76 @@
+# wake_word.py - Always-on, low-CPU wake word spotting ("jarvis")
+#
+# Runs a Vosk recognizer constrained to a tiny grammar on the shared mic
+# stream. The VAD keeps silent chunks away from it, so while the room is
+# quiet nothing but a few RMS calculations run. Only a wake word hit hands
+# over to the full large-vocabulary recognizer.
+#
+# NOTE: runtime grammars need a model that supports them (the small and
+# lgraph models do, vosk-model-en-us-0.22 does not).
+import json
+import queue
+from vosk import KaldiRecognizer
+from vad import EnergyVAD, Endpointer
+
+# -------- CONFIG ----------
+WAKE_WORDS = ["jarvis"]
+RATE = 16000
+# ---------------------------
+
+
+class WakeWordSpotter:
+    """Blocks until one of WAKE_WORDS is heard on the capture stream"""
+
+    def __init__(self, model, capture, wake_words=WAKE_WORDS, vad=None, rate=RATE):
+        self.capture = capture
+        self.wake_words = [w.lower() for w in wake_words]
+        self.rate = rate
+        self.vad = vad or EnergyVAD(rate=rate)
+        self.running = True
+
+        grammar = json.dumps(self.wake_words + ["[unk]"])
+        self.rec = KaldiRecognizer(model, rate, grammar)
+        self.rec.SetMaxAlternatives(0)
+        self.rec.SetWords(False)
+
+    def _heard(self, text):
+        words = text.lower().split()
+        return any(w in words for w in self.wake_words)
+
+    def wait(self):
+        """Return True on a wake word, False if stopped or the mic died"""
+        q = self.capture.subscribe(preroll=False)
+        endpoint = Endpointer(self.vad, self.capture.chunk / self.rate)
+        try:
+            while self.running:
+                try:
+                    data = q.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if data is None:
+                    return False
+
+                feed, done = endpoint.process(data)
+                for chunk in feed:
+                    if self.rec.AcceptWaveform(chunk):
+                        text = json.loads(self.rec.Result()).get("text", "")
+                    else:
+                        # Tiny grammar, so partials are cheap - react mid-phrase
+                        text = json.loads(self.rec.PartialResult()).get("partial", "")
+                    if self._heard(text):
+                        self.rec.Reset()
+                        # Audio already queued after the wake word becomes the next
+                        # preroll, so "Jarvis, open notepad" in one breath isn't clipped
+                        self.capture.hand_over(q)
+                        return True
+
+                if done:
+                    # End of a non-wake phrase - start fresh for the next one
+                    self.rec.Reset()
+                    endpoint = Endpointer(self.vad, self.capture.chunk / self.rate)
+            return False
+        finally:
+            self.capture.unsubscribe(q)
+
+    def stop(self):
+        self.running = False